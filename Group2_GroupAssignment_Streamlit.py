@@ -1,16 +1,15 @@
 import streamlit as st
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-import pickle
-from PIL import Image
 import time
+# heavy libraries and the model are imported by the pages that need them (see preload.py)
+import perf
+import preload
 
 # create page navigation
 def page_navigation():
+    # hidden page, not in the sidebar: open the app with ?page=performance
+    if st.query_params.get("page") == "performance":
+        page_performance()
+        return
     pages = {
         "Executive Summary": page_summary,
         "Exploratory Data Analysis": page_eda,
@@ -21,7 +20,10 @@ def page_navigation():
     st.sidebar.title("Bike Sharing Analysis & Prediction")
     selection = st.sidebar.radio("Go to", list(pages.keys()))
     page = pages[selection]
-    page()
+    with perf.span("page." + page.__name__[len("page_"):]):
+        page()
+    # warm up the other pages in the background once this one has rendered
+    preload.start()
 
 # the first page is summary
 def page_summary():
@@ -40,74 +42,104 @@ def page_summary():
     
 #the second page is our plots
 def page_eda():
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    import aggregates
+    import dataset
+    import partitions
+    import trendlines
     st.title(":green[Bike Sharing Analysis & Prediction] _GroupB_  :bicyclist: :woman-biking:")
     st.header("Exploratory Data Analysis")
+    root = partitions.default_root()
+    if root and partitions.systems(root):
+        # partitioned logs: only the partitions of the chosen systems and dates are read
+        systems = partitions.systems(root)
+        first, last = (day.date() for day in partitions.date_range(root))
+        col1, col2 = st.columns(2)
+        chosen = col1.multiselect("Systems", options=systems, default=systems, help="None selected: all systems")
+        dates = col2.date_input("Dates", value=(first, last), min_value=first, max_value=last)
+        # while a new range is being picked only its first date is set
+        start, end = (dates[0], dates[-1]) if dates else (first, last)
+        source = partitions.Selection(root, chosen, start, pd.Timestamp(end) + pd.Timedelta(days=1))
+        store = aggregates.load_selection_store(source)
+    else:
+        source = dataset.HOURLY_CSV
+        store = aggregates.load_store()
+    if not store.rows:
+        st.info("No rentals match the selected systems and dates.")
+        return
     st.subheader("Information of the dataset")
     col1, col2, col3 = st.columns(3)
-    col1.metric("Columns", "17")
-    col2.metric("Rows", "17379")
-    col3.metric("Null Values", "0")
+    col1.metric("Columns", str(len(store.columns)))
+    col2.metric("Rows", str(store.rows))
+    col3.metric("Null Values", str(store.nulls))
     st.subheader("First 5 rows of the dataset:")
     st.caption("Note: please refer to the Tech Annex for an explanation of the variables.")
-    df = pd.read_csv('bike-sharing_hourly.csv')
-    st.dataframe(df.head(), use_container_width=True)
+    st.dataframe(store.head(), use_container_width=True)
     st.subheader("Analysis of the Bike Sharing Service")
     st.caption("Note: please refer to the Insights & Conclusion for further observations and perceptions.")
     st.markdown("Overview:")
     tab1 = st.tabs(["📕 Distribution by User"])
     # 1. Distribution of Rental Counts by type of user
-    df = pd.read_csv('bike-sharing_hourly.csv')
-    fig1 = go.Figure()
-    fig1.add_trace(go.Bar(y=["Registered", "Casual"], x=[df["registered"].sum(), df["casual"].sum()], orientation='h'))
-    fig1.update_traces(opacity=0.75)
-    fig1.update_layout(title="Distribution of rental counts by type of user", yaxis_title="User type", xaxis_title="Count")
+    with perf.span("figure.eda.users"):
+        fig1 = go.Figure()
+        fig1.add_trace(go.Bar(y=["Registered", "Casual"], x=[store.totals["registered"], store.totals["casual"]], orientation='h'))
+        fig1.update_traces(opacity=0.75)
+        fig1.update_layout(title="Distribution of rental counts by type of user", yaxis_title="User type", xaxis_title="Count")
     tab1[0].plotly_chart(fig1, use_container_width=True)
     
     st.markdown("By Time & Season:")
-    df = pd.read_csv('bike-sharing_hourly.csv')
     tab2, tab3, tab4, tab5, tab6, tab10 = st.tabs(["📗 by Season", "📘 by Month", "📙 by Day", "📓 by Weekday/Weekend", "🎉 by Holiday", "⏱ by Hour"])
     # 2. Rental Counts by Season
-    grouped_season = df.groupby("season").sum()["cnt"]
-    fig2 = px.bar(grouped_season, title="Rental Counts by Season")
-    fig2.update_layout(xaxis_title="Season", yaxis_title="Rental counts",
-                      xaxis=dict(tickmode='array', tickvals=[1, 2, 3, 4],
-                                 ticktext=['Winter', 'Spring', 'Summer', 'Fall']))
+    with perf.span("figure.eda.season"):
+        grouped_season = store.rollup("season")
+        fig2 = px.bar(grouped_season, title="Rental Counts by Season")
+        fig2.update_layout(xaxis_title="Season", yaxis_title="Rental counts",
+                          xaxis=dict(tickmode='array', tickvals=[1, 2, 3, 4],
+                                     ticktext=['Winter', 'Spring', 'Summer', 'Fall']))
     # 3. Rental Counts by Month of the year
-    grouped_month = df.groupby("mnth").sum()["cnt"]
-    fig3 = px.bar(grouped_month, title="Rental Counts by Month")
-    fig3.update_layout(xaxis_title="Month", yaxis_title="Rental counts",
-                      xaxis=dict(tickmode='array', tickvals=[1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12],
-                                 ticktext=['January', 'February', 'March', 'April', 'May', 'June', 
-                                           'July', 'August', 'September', 'October', 'November', 'December']))
+    with perf.span("figure.eda.month"):
+        grouped_month = store.rollup("mnth")
+        fig3 = px.bar(grouped_month, title="Rental Counts by Month")
+        fig3.update_layout(xaxis_title="Month", yaxis_title="Rental counts",
+                          xaxis=dict(tickmode='array', tickvals=[1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12],
+                                     ticktext=['January', 'February', 'March', 'April', 'May', 'June', 
+                                               'July', 'August', 'September', 'October', 'November', 'December']))
 
     # 4. Rental Counts by Day of the week
-    fig4 = px.bar(df, x="weekday", y=["casual", "registered"], title="Rental Counts by Day of the week", barmode="stack")
-    fig4.update_layout(xaxis_title="Day of the week", yaxis_title="Rental counts",
-                  xaxis=dict(tickmode='array', tickvals=[0, 1, 2, 3, 4, 5, 6], 
-                             ticktext=['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']))
+    with perf.span("figure.eda.weekday"):
+        grouped_weekday_users = store.rollup_frame("weekday")
+        fig4 = px.bar(grouped_weekday_users, x=grouped_weekday_users.index, y=["casual", "registered"], title="Rental Counts by Day of the week", barmode="stack")
+        fig4.update_layout(xaxis_title="Day of the week", yaxis_title="Rental counts",
+                      xaxis=dict(tickmode='array', tickvals=[0, 1, 2, 3, 4, 5, 6], 
+                                 ticktext=['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']))
 
     # 5. Rental Counts by weekday or weekend
-    grouped_weekday = df.groupby("workingday").sum()["cnt"]
+    with perf.span("figure.eda.workingday"):
+        grouped_weekday = store.rollup("workingday")
 
-    fig5 = px.bar(grouped_weekday, title="Rental Counts if the Day is a weekday or weekend")
-    fig5.update_layout(xaxis_title="Weekday or Weekend?", yaxis_title="Rental counts",
-                      xaxis=dict(tickmode='array', tickvals=[0, 1],
-                                 ticktext=['Weekend', 'Weekday']))
+        fig5 = px.bar(grouped_weekday, title="Rental Counts if the Day is a weekday or weekend")
+        fig5.update_layout(xaxis_title="Weekday or Weekend?", yaxis_title="Rental counts",
+                          xaxis=dict(tickmode='array', tickvals=[0, 1],
+                                     ticktext=['Weekend', 'Weekday']))
     # Rental Counts by holiday
-    grouped_holiday = df.groupby("holiday").sum()["cnt"]
+    with perf.span("figure.eda.holiday"):
+        grouped_holiday = store.rollup("holiday")
 
-    fig6 = px.bar(grouped_holiday, title="Rental Counts if the Day is a holiday")
-    fig6.update_layout(xaxis_title="Holiday?", yaxis_title="Rental counts",
-                      xaxis=dict(tickmode='array', tickvals=[0, 1],
-                                 ticktext=['Non-holiday', 'Holiday']))
+        fig6 = px.bar(grouped_holiday, title="Rental Counts if the Day is a holiday")
+        fig6.update_layout(xaxis_title="Holiday?", yaxis_title="Rental counts",
+                          xaxis=dict(tickmode='array', tickvals=[0, 1],
+                                     ticktext=['Non-holiday', 'Holiday']))
     # Rental Counts by Hours
-    grouped_hours = df.groupby("hr").sum()["cnt"]
-    fig10 = go.Figure()
-    fig10.add_trace(go.Line(x=df["hr"], y=grouped_hours, mode='lines', name='Count of rental bikes'))
-    fig10.update_layout(title="Rental Counts per hour",
-                  xaxis_title="Hour of the day",
-                  yaxis_title="Rental bike count",
-                  xaxis=dict(tickmode='linear', tick0=0, dtick=1, tickvals=df["hr"], ticktext=[str(i) + ":00" for i in df["hr"]]))
+    with perf.span("figure.eda.hour"):
+        grouped_hours = store.rollup("hr")
+        fig10 = go.Figure()
+        fig10.add_trace(go.Scatter(x=grouped_hours.index, y=grouped_hours, mode='lines', name='Count of rental bikes'))
+        fig10.update_layout(title="Rental Counts per hour",
+                      xaxis_title="Hour of the day",
+                      yaxis_title="Rental bike count",
+                      xaxis=dict(tickmode='linear', tick0=0, dtick=1, tickvals=grouped_hours.index, ticktext=[str(i) + ":00" for i in grouped_hours.index]))
     tab2.plotly_chart(fig2, use_container_width=True)
     tab3.plotly_chart(fig3, use_container_width=True)
     tab4.plotly_chart(fig4, use_container_width=True)
@@ -116,28 +148,29 @@ def page_eda():
     tab10.plotly_chart(fig10, use_container_width=True)
     
     st.markdown("By Weather Condition:")
-    df = pd.read_csv('bike-sharing_hourly.csv')
     
 
 # 7. Rental Counts by weather situation
-    df = pd.read_csv('bike-sharing_hourly.csv')
     tab7, tab8, tab9 = st.tabs(["🌀 by Weather", "🔆 by Temperature", "💦 by Humidity"])
-    grouped_weather = df.groupby("weathersit").sum()["cnt"]
-    fig7 = px.bar(grouped_weather, title="Rental Counts by Weather situation")
-    fig7.update_layout(xaxis_title="Weather Situation", yaxis_title="Rental counts", 
-                   xaxis=dict(tickmode='array', tickvals=[1,2,3,4], 
-                              ticktext=['Clear, Few clouds, Partly cloudy', 
-                                        'Mist + Cloudy, Mist + Broken clouds', 
-                                        'Light Snow, Light Rain + Thunderstorm', 
-                                        'Heavy Rain + Ice Pallets + Thunderstorm + Snow, Fog']))
+    with perf.span("figure.eda.weather"):
+        grouped_weather = store.rollup("weathersit")
+        fig7 = px.bar(grouped_weather, title="Rental Counts by Weather situation")
+        fig7.update_layout(xaxis_title="Weather Situation", yaxis_title="Rental counts", 
+                       xaxis=dict(tickmode='array', tickvals=[1,2,3,4], 
+                                  ticktext=['Clear, Few clouds, Partly cloudy', 
+                                            'Mist + Cloudy, Mist + Broken clouds', 
+                                            'Light Snow, Light Rain + Thunderstorm', 
+                                            'Heavy Rain + Ice Pallets + Thunderstorm + Snow, Fog']))
 
 # 8. Rental Counts by Temperature
-    fig8 = px.scatter(df, x="temp", y="cnt", trendline="lowess", title="Rental Counts by Temperature", trendline_color_override="red")
-    fig8.update_layout(xaxis_title="Temperature", yaxis_title="Rental counts")
+    with perf.span("figure.eda.temperature"):
+        fig8 = trendlines.scatter_with_trend(source, "temp", "cnt", title="Rental Counts by Temperature")
+        fig8.update_layout(xaxis_title="Temperature", yaxis_title="Rental counts")
 
 # 9. Rental Counts by Humidity
-    fig9 = px.scatter(df, x="hum", y="cnt", trendline="lowess", title="Rental Counts by Humidity", trendline_color_override="red")
-    fig9.update_layout(xaxis_title="Humidity", yaxis_title="Rental counts")
+    with perf.span("figure.eda.humidity"):
+        fig9 = trendlines.scatter_with_trend(source, "hum", "cnt", title="Rental Counts by Humidity")
+        fig9.update_layout(xaxis_title="Humidity", yaxis_title="Rental counts")
 
     tab7.plotly_chart(fig7, use_container_width=True)
     tab8.plotly_chart(fig8, use_container_width=True)
@@ -146,62 +179,12 @@ def page_eda():
 
 #--------------------------------------
 
-# Auxiliary functions
-def get_season(month):
-    if month in [12, 1, 2]:
-        return 0
-    elif month in [3, 4, 5]:
-        return 1
-    elif month in [6, 7, 8]:
-        return 2
-    else:
-        return 3
-    
-def comf_hum (humidity_normalized):
-    if humidity_normalized >= 0.25 and humidity_normalized <= 0.55:
-        return 1
-    else:
-        return 0
-    
-def comf_temp (temp_normalized):
-    if temp_normalized >= 0.40 and temp_normalized <= 0.65:
-        return 1
-    else:
-        return 0
-    
-def hour_to_time_of_day(hour):
-    time_of_day_dict = {
-        0: 0,
-        1: 0,
-        2: 0,
-        3: 0,
-        4: 0,
-        5: 0,
-        6: 1,
-        7: 1,
-        8: 1,
-        9: 1,
-        10: 1,
-        11: 1,
-        12: 1,
-        13: 2,
-        14: 2,
-        15: 2,
-        16: 2,
-        17: 3,
-        18: 3,
-        19: 3,
-        20: 3,
-        21: 0,
-        22: 0,
-        23: 0
-    }
-    return time_of_day_dict[hour]
-
 #the third page is about the model
 def page_model():
-    model = pickle.load(open("bikeRentalsModel.pkl", "rb"))
-    df = pd.read_csv("preprocessed-df.csv")
+    import features
+    import model_registry
+    import prediction_cache
+    registry = model_registry.get_registry()
     
     weather_values = ['Clear, Few clouds, Partly cloudy, Partly cloudy',
                       "Mist + Cloudy, Mist + Broken clouds, Mist + Few clouds, Mist",
@@ -213,6 +196,10 @@ def page_model():
     month_values = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
     
     st.title(":green[Bike Sharing Analysis & Prediction] _GroupB_  :bicyclist: :woman-biking:")
+    mode = st.radio("Forecast", ["Single hour", "Day / week profile"], horizontal=True)
+    if mode == "Day / week profile":
+        page_profile(registry, weather_values)
+        return
     st.subheader("Enter the following information to predict the number of bike rentals:")
     st.markdown('Time-wise:') 
     col1, col2 = st.columns(2)
@@ -231,50 +218,70 @@ def page_model():
         
     with col1:
         weather = st.selectbox('Weather', options=[1, 2, 3, 4], format_func=lambda x: weather_values[x-1])
-        conv_factor2 = 100.0
+        conv_factor2 = features.HUMIDITY_SCALE
         humidity = st.slider('Humidity (%)', min_value=0, max_value=int(conv_factor2), step=1, value=int(0.5*conv_factor2), format='%d %%')
-        humidity_normalized = humidity / conv_factor2
 
     with col2:
-        conv_factor = 41.0
+        conv_factor = features.TEMP_SCALE
         temp = st.slider('Temperature (°C)', min_value=0, max_value=int(conv_factor), step=1, value=int(0.5*conv_factor), format='%d °C')
-        temp_normalized = temp / conv_factor
-        conv_factor1 = 67.0
+        conv_factor1 = features.WINDSPEED_SCALE
         windspeed = st.slider('Wind Speed (km/h)', min_value=0, max_value=int(conv_factor1), step=1, value=int(0.5*conv_factor1), format='%d km/h')
-        windspeed_normalized = windspeed / conv_factor1
-
-        
-        
-                
-    input_data = {
-        'season': get_season(month),
-        'yr': year,
-        'mnth': month,
-        'hr': hour,
-        'holiday': holiday,
-        'weekday': weekday,
-        'workingday': 1 - holiday,
-        'weathersit': weather,
-        'atemp': temp_normalized,
-        'hum': humidity_normalized,
-        'windspeed': windspeed_normalized,
-        'day' : day,
-        'time_of_day' : hour_to_time_of_day(hour),
-        'comfortable_temp' : comf_temp(temp_normalized),
-        'comfortable_humidity' : comf_hum(humidity_normalized)
-    }
 
-    input_df = pd.DataFrame([input_data])
-
-    prediction = model.predict(input_df)
+    prediction = prediction_cache.predict_scenario(registry, year, month, day, hour, holiday, weekday,
+                                                   weather, temp, humidity, windspeed)
     
-    rounded_prediction = round(prediction[0])
+    rounded_prediction = round(prediction)
     
     st.subheader('Predicted Number of Bike Rentals:')
     st.markdown(f"<p style='font-size:30px; color:green'>{rounded_prediction}</p>", unsafe_allow_html=True)
     bike_emoji = '<span style="font-size:30px"> 🚲 </span>'
     st.write(bike_emoji * rounded_prediction, unsafe_allow_html=True)
     
+# demand profile for a whole day or week, scored in one batch
+def page_profile(registry, weather_values):
+    import pandas as pd
+    import plotly.express as px
+    import features
+    import forecast
+    st.subheader("Enter the dates and the hourly weather to forecast a demand profile:")
+    col1, col2 = st.columns(2)
+    with col1:
+        start = st.date_input('Start date', value=pd.Timestamp('2012-06-04'),
+                              min_value=pd.Timestamp('2011-01-01'))
+    with col2:
+        days = st.selectbox('Horizon', options=[1, 7], format_func=lambda x: "24 hours" if x == 1 else "7 days")
+    hours = forecast.profile_hours(start, days)
+    holidays = st.multiselect('Holidays', options=list(hours.normalize().unique()),
+                              format_func=lambda x: x.strftime('%A %d %B %Y'))
+
+    st.markdown('Hourly weather (edit any cell):')
+    weather_table = pd.DataFrame({
+        'time': hours,
+        'weather': 1,
+        'temp': int(0.5 * features.TEMP_SCALE),
+        'humidity': int(0.5 * features.HUMIDITY_SCALE),
+        'windspeed': int(0.5 * features.WINDSPEED_SCALE),
+    })
+    weather_table = st.data_editor(weather_table, hide_index=True, use_container_width=True, column_config={
+        'time': st.column_config.DatetimeColumn('Time', disabled=True, format='ddd DD MMM, HH:mm'),
+        'weather': st.column_config.SelectboxColumn('Weather', options=[1, 2, 3, 4], required=True,
+                                                    help=" / ".join("%d: %s" % (i + 1, v) for i, v in enumerate(weather_values))),
+        'temp': st.column_config.NumberColumn('Temperature (°C)', min_value=0, max_value=int(features.TEMP_SCALE), step=1, required=True),
+        'humidity': st.column_config.NumberColumn('Humidity (%)', min_value=0, max_value=int(features.HUMIDITY_SCALE), step=1, required=True),
+        'windspeed': st.column_config.NumberColumn('Wind Speed (km/h)', min_value=0, max_value=int(features.WINDSPEED_SCALE), step=1, required=True),
+    })
+
+    profile = forecast.forecast_profile(registry, start, days, weather_table['weather'], weather_table['temp'],
+                                        weather_table['humidity'], weather_table['windspeed'], holidays)
+    col1, col2 = st.columns(2)
+    col1.metric("Total predicted rentals", f"{round(profile['prediction'].sum()):,}")
+    peak = profile.loc[profile['prediction'].idxmax()]
+    col2.metric("Peak hour", peak['datetime'].strftime('%a %H:00'), f"{round(peak['prediction'])} rentals", delta_color="off")
+    with perf.span("figure.profile"):
+        fig = px.line(profile, x='datetime', y='prediction', title='Predicted Bike Rentals per Hour')
+        fig.update_layout(xaxis_title="Time", yaxis_title="Predicted rentals")
+    st.plotly_chart(fig, use_container_width=True)
+
 #the forth page is about the insights
 def page_conclusion():
     st.title(":green[Bike Sharing Analysis & Prediction] _GroupB_  :bicyclist: :woman-biking:")
@@ -310,41 +317,120 @@ def page_conclusion():
         st.subheader('Gather Data to See What are The Most Popular Routes')
         st.markdown("<p style='font-size:18px'> For future recommendations, we suggest gathering data about the most common routes taken by registered cyclists and those used by people who commute (those renting bikes around 8 am and/or 5 pm). Then, the city of DC should use this data in order to prioritize which parts of the city needs a new or improved bike lane. In addition, any campaign’s propaganda, as the one mentioned above for safety, should be concentrated on these areas.  </p>", unsafe_allow_html=True)
 	
+# report how much a chart sends to the browser
+def figure_caption(fig, seconds):
+    points = sum(len(trace.x) for trace in fig.data if trace.x is not None)
+    st.caption(f"{points:,} points, {len(fig.to_json()) / 1024:,.0f} KB payload, built in {seconds * 1000:,.0f} ms")
+
+# hourly rentals of one system from the partitioned logs; only partitions overlapping [start, end) are read
+def partitioned_rentals(root, system, start=None, end=None):
+    import pandas as pd
+    import partitions
+    rows = partitions.Selection(root, [system], start, end).read(["dteday", "hr", "cnt"])
+    hours = pd.to_datetime(rows["dteday"]) + pd.to_timedelta(rows["hr"].astype("int64"), unit="h")
+    return pd.DataFrame({"dteday": hours, "cnt": rows["cnt"]}).sort_values("dteday", kind="stable", ignore_index=True)
+
+# the same hours scored with the model, for comparing a system's rentals with the predictions
+def scored_rentals(root, system, start=None, end=None):
+    import pandas as pd
+    import features
+    import model_registry
+    import partitions
+    rows = partitions.Selection(root, [system], start, end).read(partitions.COLUMNS)
+    hours = pd.to_datetime(rows["dteday"]) + pd.to_timedelta(rows["hr"].astype("int64"), unit="h")
+    scored = pd.DataFrame({"dteday": hours, "cnt": rows["cnt"],
+                           "prediction": model_registry.get_registry().predict(features.model_input(rows))})
+    return scored.sort_values("dteday", kind="stable", ignore_index=True)
+
 #the fifth page is about the result
 def page_annex():
+    import pandas as pd
+    import plotly.graph_objects as go
+    import backtest
+    import dataset
+    import downsample
+    import partitions
     st.title(":green[Bike Sharing Analysis & Prediction] _GroupB_  :bicyclist: :woman-biking:")
     st.header("Tech Annex")
     tab1, tab2 = st.tabs(["📈 Model Accuracy", "📋 Variable Explanation"])
     with tab1:
         st.subheader("Model Accuracy:")
-        col1, col2 = st.columns(2)
-        col1.metric("R2 Score", "0.86")
-        col2.metric("Almost Correct Predictions", "90.13%")
-        model = pickle.load(open("bikeRentalsModel.pkl", "rb"))
-        df = pd.read_csv("preprocessed-df.csv")
-        cutoff_date = pd.to_datetime('2012-09-01')
-        df["dteday"] = pd.to_datetime(df["dteday"])
-        train = df.loc[df.dteday < cutoff_date]
-        test = df.loc[df.dteday >= cutoff_date]
+        result = backtest.get_backtest()
+        overall = result["overall"]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("R2 Score", f"{overall['r2']:.2f}")
+        col2.metric("Almost Correct Predictions", f"{overall['almost_correct']:.2%}",
+                    help=f"Predictions within {result['tolerance']} rentals of the actual count")
+        col3.metric("MAE", f"{overall['mae']:.1f}")
+        col4.metric("RMSE", f"{overall['rmse']:.1f}")
+        folds = pd.DataFrame(result["folds"]).rename(columns={
+            "start": "From", "end": "To", "rows": "Hours", "r2": "R2", "mae": "MAE", "rmse": "RMSE",
+            "almost_correct": "Almost correct"})
+        st.caption("Monthly holdout folds after 2012-09-01: the model was trained once on the earlier data "
+                   "and is not refit; each fold is one month of the holdout period:")
+        st.dataframe(folds, hide_index=True, use_container_width=True)
+        df = dataset.load_preprocessed()
+        cutoff_date = pd.to_datetime(result["cutoffs"][0])
+        root = partitions.default_root()
+        # with partitioned logs the actual rentals are those of the chosen system
+        system = st.selectbox("System", partitions.systems(root)) if root else None
+        if system is None:
+            first, last = df['dteday'].iloc[0], df['dteday'].iloc[-1]
+            train = df.loc[df.dteday < cutoff_date]
+            test = pd.DataFrame({"dteday": result["dteday"], "cnt": result["actual"]})
+            predictions = result["prediction"]
+        else:
+            st.caption(f"The metrics above are those of the holdout folds of the bundled dataset; the charts below "
+                       f"compare the rentals of {system} with the model's predictions for the same hours.")
+            first, last = partitions.date_range(root, [system])
+            last += pd.Timedelta(hours=23)
+            # hold out the system's last months, one per backtest fold (September to December 2012 for dc)
+            cutoff_date = max(first, last.to_period("M").to_timestamp() - pd.DateOffset(months=len(result["cutoffs"]) - 1))
+            train = partitioned_rentals(root, system, end=cutoff_date)
+            test = scored_rentals(root, system, start=cutoff_date)
+            predictions = test["prediction"]
 
-        X_train, y_train, X_test, y_test = train.drop(["cnt", "dteday"], axis=1), train["cnt"], test.drop(["cnt", "dteday"], axis=1), test["cnt"]
-        predictions = model.predict(X_test)
+        if not len(test):
+            st.info(f"No hours of {system} to compare with the model's predictions.")
+        else:
+            # Creating the line chart from downsampled series
+            start = time.perf_counter()
+            with perf.span("figure.annex.backtest"):
+                train_x, train_y = downsample.downsample(train['dteday'], train['cnt'])
+                pred_x, pred_y = downsample.downsample(test['dteday'], predictions)
+                # go.Scatter also takes an empty series, e.g. a system with no hours before its cutoff
+                fig10 = go.Figure(go.Scatter(x=train_x, y=train_y, name='Actual', mode='lines'))
+                fig10.update_layout(title='Actual vs Predicted Bike Rentals', xaxis_title='dteday', yaxis_title='cnt')
+                actual_trace = go.Scatter(x=pred_x, y=pred_y, name='Prediction', line=dict(color='#FF6433'))
+                fig10.add_trace(actual_trace)
+            st.plotly_chart(fig10)
+            figure_caption(fig10, time.perf_counter() - start)
 
-        # Creating the line chart with Plotly Express
-        fig10 = px.line(train, x='dteday', y='cnt', title='Actual vs Predicted Bike Rentals')
-        actual_trace = go.Scatter(x=test["dteday"], y=predictions, name='Prediction', line=dict(color='#FF6433'))
-        fig10.add_trace(actual_trace)
-        st.plotly_chart(fig10)
-
-        # Creating the line chart with Plotly Express
-        fig11 = px.line(x=test['dteday'], y=predictions, title='Actual vs Predicted Bike Rentals (Zoomed-In)')
-        # Creating a new trace for the actual values
-        actual_trace = go.Scatter(x=df['dteday'], y=df['cnt'], name='Actual', line=dict(color='#1EB33D'))
-        # Adding the actual and mean error traces to the figure
-        fig11.add_trace(actual_trace)
-        # Setting the range for the x-axis to show a zoomed in region
-        fig11.update_xaxes(range=['2012-12-01 00:00:00', '2012-12-31 00:00:00'])
-        st.plotly_chart(fig11)
+            # Zoomed-in chart: only the selected window is sent, at full resolution when it fits
+            # the last month by default
+            window_start = max(first, last.to_period("M").to_timestamp())
+            zoom_start, zoom_end = st.slider('Zoom window', min_value=first.to_pydatetime(), max_value=last.to_pydatetime(),
+                                             value=(window_start.to_pydatetime(), last.to_pydatetime()),
+                                             format='YYYY-MM-DD')
+            start = time.perf_counter()
+            with perf.span("figure.annex.zoom"):
+                pred_x, pred_y = downsample.downsample(test['dteday'], predictions, start=zoom_start, end=zoom_end)
+                if system is None:
+                    actual = df
+                else:
+                    actual = partitioned_rentals(root, system, zoom_start, zoom_end + pd.Timedelta(days=1))
+                actual_x, actual_y = downsample.downsample(actual['dteday'], actual['cnt'], start=zoom_start, end=zoom_end)
+                # Creating the line chart; go.Scatter also takes the empty prediction series of a window before the cutoff
+                fig11 = go.Figure(go.Scatter(x=pred_x, y=pred_y, name='Prediction', mode='lines'))
+                fig11.update_layout(title='Actual vs Predicted Bike Rentals (Zoomed-In)', xaxis_title='dteday', yaxis_title='cnt')
+                # Creating a new trace for the actual values
+                actual_trace = go.Scatter(x=actual_x, y=actual_y, name='Actual', line=dict(color='#1EB33D'))
+                # Adding the actual and mean error traces to the figure
+                fig11.add_trace(actual_trace)
+                # Setting the range for the x-axis to show the zoomed in region
+                fig11.update_xaxes(range=[zoom_start, zoom_end])
+            st.plotly_chart(fig11)
+            figure_caption(fig11, time.perf_counter() - start)
     with tab2: 
         st.subheader("Variable Explanation:")
         st.write("""- `instant`: record index
@@ -377,6 +463,40 @@ def page_annex():
 - `registered`: count of registered users
 - `cnt`: count of total rental bikes including both casual and registered""")
 
+
+# hidden page with the timing spans and cache counters of this server process
+def page_performance():
+    import sys
+    import pandas as pd
+    st.title(":green[Bike Sharing Analysis & Prediction] _GroupB_  :bicyclist: :woman-biking:")
+    st.header("Performance")
+    st.caption("Counters of this server process (all sessions) since it started or was last reset.")
+    if st.button("Reset timing spans"):
+        perf.reset()
+    spans = perf.stats()
+    st.subheader("Timing spans")
+    if spans:
+        table = pd.DataFrame.from_dict(spans, orient="index").rename_axis("span").reset_index()
+        st.dataframe(table, hide_index=True, use_container_width=True, column_config={
+            name: st.column_config.NumberColumn(format="%.1f") for name in table.columns if name.endswith("_ms")})
+    else:
+        st.info("No spans recorded yet: open the other pages first.")
+
+    # only report what is loaded, this page must not load the model or the data itself
+    st.subheader("Model and caches")
+    if "model_registry" in sys.modules:
+        for path, registry in sys.modules["model_registry"].loaded_registries().items():
+            st.caption(f"Model {path}")
+            st.json(registry.stats(), expanded=False)
+    if "prediction_cache" in sys.modules:
+        st.caption("Single-hour predictions")
+        st.json(sys.modules["prediction_cache"].stats(), expanded=False)
+    if "forecast" in sys.modules:
+        st.caption("Day / week profiles")
+        st.json(sys.modules["forecast"].stats(), expanded=False)
+    st.caption("Background preload" + ("" if preload.done.is_set() else " (running)"))
+    st.json({"timings_seconds": preload.timings, "error": preload.error}, expanded=False)
+
     
 # Run the app
 if __name__ == "__main__":
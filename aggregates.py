@@ -0,0 +1,264 @@
+"""Precomputed rollups behind the EDA page.
+
+All the sums the page charts (rentals by season, month, working day,
+holiday, hour and weather, casual / registered riders by weekday and in
+total) plus the row, column and null counts are built in one streaming
+pass over the hourly CSV and persisted next to the other caches.  When
+rows are appended to the CSV only the new bytes are parsed and added to
+the stored rollups, so page cost does not grow with the length of the
+rental log.  Stores for a partitioned dataset (``partitions.Selection``)
+are built by streaming only the selected partitions and kept in memory.
+"""
+import collections
+import hashlib
+import io
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import dataset
+import perf
+
+STORE_DIR = os.path.join(dataset.CACHE_ROOT, "aggregates")
+
+# rollup key -> summed columns
+ROLLUPS = {
+    "season": ["cnt"],
+    "mnth": ["cnt"],
+    "workingday": ["cnt"],
+    "holiday": ["cnt"],
+    "hr": ["cnt"],
+    "weathersit": ["cnt"],
+    "weekday": ["casual", "registered"],
+}
+TOTALS = ["casual", "registered", "cnt"]
+
+HEAD_ROWS = 5
+CHUNKSIZE = 200_000
+# bytes before the consumed offset used to check the file was only appended to
+TAIL_CHECK_BYTES = 4096
+
+# stores of partition selections kept in memory, the most recent last
+SELECTION_STORES = 16
+
+_lock = threading.Lock()
+_stores = {}
+_selection_stores = collections.OrderedDict()
+# one lock per selection being built, so a scan only holds up readers of the same selection
+_selection_builds = {}
+
+
+class _Slice(io.RawIOBase):
+    """The next ``length`` bytes of a binary file."""
+
+    def __init__(self, f, length):
+        self._f = f
+        self._left = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._f.readinto(memoryview(buffer)[:min(len(buffer), self._left)])
+        self._left -= n
+        return n
+
+
+def _consumable_end(path, size):
+    # offset just after the last complete line
+    with open(path, "rb") as f:
+        position = size
+        while position > 0:
+            start = max(0, position - 65536)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+    return 0
+
+
+def _tail_digest(path, offset):
+    with open(path, "rb") as f:
+        f.seek(max(0, offset - TAIL_CHECK_BYTES))
+        return hashlib.sha256(f.read(min(offset, TAIL_CHECK_BYTES))).hexdigest()
+
+
+def _header(path):
+    with open(path, "rb") as f:
+        return f.readline().decode().strip()
+
+
+class AggregateStore:
+    def __init__(self):
+        self.columns = []
+        self.rows = 0
+        self.nulls = 0
+        self.totals = {name: 0 for name in TOTALS}
+        self.head_records = []
+        # key -> {"rows": counts by key value, column: sums by key value}
+        self.rollups = {key: {name: np.zeros(0, dtype=np.int64) for name in ["rows"] + columns}
+                        for key, columns in ROLLUPS.items()}
+        self.source = None
+
+    def append(self, frame):
+        """Add hourly rows (a DataFrame in the CSV schema) to every rollup."""
+        if not self.columns:
+            self.columns = list(frame.columns)
+        if len(self.head_records) < HEAD_ROWS:
+            head = frame.head(HEAD_ROWS - len(self.head_records)).astype(object)
+            self.head_records.extend(head.where(head.notna(), None).to_dict("records"))
+        self.rows += len(frame)
+        self.nulls += int(frame.isna().sum().sum())
+        for name in TOTALS:
+            self.totals[name] += int(frame[name].sum())
+        for key, columns in ROLLUPS.items():
+            keys = frame[key].to_numpy(dtype=np.int64)
+            sums = self.rollups[key]
+            length = max(len(sums["rows"]), int(keys.max()) + 1 if len(keys) else 0)
+            for name in ["rows"] + columns:
+                weights = None if name == "rows" else frame[name].to_numpy(dtype=np.float64)
+                counts = np.bincount(keys, weights=weights, minlength=length)
+                sums[name] = np.pad(sums[name], (0, length - len(sums[name]))) + np.rint(counts).astype(np.int64)
+
+    def rollup(self, key, column="cnt"):
+        """Series of ``column`` summed by ``key``, like ``df.groupby(key)[column].sum()``."""
+        sums = self.rollups[key]
+        present = np.flatnonzero(sums["rows"])
+        return pd.Series(sums[column][present], index=pd.Index(present, name=key), name=column)
+
+    def rollup_frame(self, key, columns=None):
+        return pd.concat([self.rollup(key, column) for column in columns or ROLLUPS[key]], axis=1)
+
+    def head(self):
+        return pd.DataFrame(self.head_records, columns=self.columns)
+
+    def to_dict(self):
+        return {
+            "columns": self.columns, "rows": self.rows, "nulls": self.nulls,
+            "totals": self.totals, "head": self.head_records, "source": self.source,
+            "rollups": {key: {name: values.tolist() for name, values in sums.items()}
+                        for key, sums in self.rollups.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        store = cls()
+        store.columns = data["columns"]
+        store.rows = data["rows"]
+        store.nulls = data["nulls"]
+        store.totals = data["totals"]
+        store.head_records = data["head"]
+        store.source = data["source"]
+        for key, sums in data["rollups"].items():
+            store.rollups[key] = {name: np.asarray(values, dtype=np.int64) for name, values in sums.items()}
+        return store
+
+    def _read(self, path, start, end):
+        with open(path, "rb") as f:
+            f.seek(start)
+            reader = io.BufferedReader(_Slice(f, end - start))
+            if start == 0:
+                chunks = pd.read_csv(reader, chunksize=CHUNKSIZE)
+            else:
+                chunks = pd.read_csv(reader, header=None, names=self.columns, chunksize=CHUNKSIZE)
+            for chunk in chunks:
+                self.append(chunk)
+
+    def refresh(self, path):
+        """Bring the store up to date with ``path``; returns True if anything changed.
+
+        Appended rows are read incrementally; any other change to the file
+        rebuilds the store from scratch.
+        """
+        size = os.path.getsize(path)
+        source = self.source
+        appended_only = (
+            source is not None
+            and size >= source["offset"]
+            and _header(path) == source["header"]
+            and _tail_digest(path, source["offset"]) == source["tail_sha256"]
+        )
+        if appended_only and size == source["offset"]:
+            return False
+        if not appended_only:
+            self.__init__()
+        start = self.source["offset"] if appended_only else 0
+        end = _consumable_end(path, size)
+        if end <= start:
+            return False
+        self._read(path, start, end)
+        self.source = {"path": os.path.basename(path), "offset": end, "header": _header(path),
+                       "tail_sha256": _tail_digest(path, end)}
+        return True
+
+
+def _store_path(csv_path):
+    return os.path.join(STORE_DIR, os.path.splitext(os.path.basename(csv_path))[0] + ".json")
+
+
+def save(store, csv_path):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    target = _store_path(csv_path)
+    tmp = target + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(store.to_dict(), f)
+    os.replace(tmp, target)
+
+
+@perf.timed("data.aggregates")
+def load_store(csv_path=dataset.HOURLY_CSV):
+    """The up-to-date aggregate store for ``csv_path``, shared by the whole process."""
+    path = dataset._resolve(csv_path)
+    signature = dataset._stat_signature(path)
+    entry = _stores.get(path)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+    with _lock:
+        entry = _stores.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        # refresh a copy so sessions reading the current store are not disturbed
+        store = AggregateStore.from_dict(entry[1].to_dict()) if entry is not None else None
+        if store is None and os.path.exists(_store_path(path)):
+            with open(_store_path(path)) as f:
+                store = AggregateStore.from_dict(json.load(f))
+        if store is None:
+            store = AggregateStore()
+        if store.refresh(path):
+            save(store, path)
+        _stores[path] = (signature, store)
+        return store
+
+
+@perf.timed("data.aggregates")
+def load_selection_store(selection):
+    """The aggregate store of a ``partitions.Selection``, built part by part on first use."""
+    key = selection.key
+    with _lock:
+        store = _selection_stores.get(key)
+        if store is not None:
+            _selection_stores.move_to_end(key)
+            return store
+        building = _selection_builds.setdefault(key, threading.Lock())
+    with building:
+        with _lock:
+            store = _selection_stores.get(key)
+        if store is not None:
+            return store
+        try:
+            store = AggregateStore()
+            for frame in selection.scan():
+                store.append(frame)
+            with _lock:
+                _selection_stores[key] = store
+                while len(_selection_stores) > SELECTION_STORES:
+                    _selection_stores.popitem(last=False)
+        finally:
+            with _lock:
+                _selection_builds.pop(key, None)
+        return store
@@ -0,0 +1,164 @@
+"""Monthly holdout folds of the rentals model after 2012-09-01.
+
+The shipped model was trained once, on the data before 2012-09-01, and is
+not refit at any cutoff: the folds are consecutive monthly slices of that
+single holdout period (the preprocessed data after each cutoff, up to the
+next one), so they show how the error varies from month to month, not how
+a model retrained on more history would do.  Folds are scored in parallel
+worker processes and R2, MAE, RMSE and the "almost correct" rate are
+computed with array operations for every fold and for all folds together.
+Results (metrics and the per-hour predictions) are stored under
+``.cache/backtest`` keyed by the hashes of the model file, the dataset and
+the cutoffs, so the Tech Annex reads them instead of re-scoring the
+holdout period on every visit.
+
+    python backtest.py --workers 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import dataset
+import features
+import model_registry
+import perf
+
+BACKTEST_DIR = os.path.join(dataset.CACHE_ROOT, "backtest")
+
+# the original single split was at 2012-09-01; one monthly fold per cutoff from there
+CUTOFFS = ["2012-09-01", "2012-10-01", "2012-11-01", "2012-12-01"]
+
+# a prediction within this many rentals of the actual count is "almost correct"
+ALMOST_CORRECT_TOLERANCE = 100
+
+_results = {}
+_results_lock = threading.Lock()
+
+
+def metrics(actual, predicted, tolerance=ALMOST_CORRECT_TOLERANCE):
+    actual = np.asarray(actual, dtype=np.float64)
+    error = np.asarray(predicted, dtype=np.float64) - actual
+    total = np.square(actual - actual.mean()).sum()
+    return {
+        "rows": int(len(actual)),
+        "r2": float(1 - np.square(error).sum() / total) if total > 0 else float("nan"),
+        "mae": float(np.abs(error).mean()),
+        "rmse": float(np.sqrt(np.square(error).mean())),
+        "almost_correct": float((np.abs(error) <= tolerance).mean()),
+    }
+
+
+def fold_bounds(cutoffs):
+    """(start, end) pairs; the last fold runs to the end of the data."""
+    starts = [pd.Timestamp(c) for c in cutoffs]
+    return list(zip(starts, starts[1:] + [None]))
+
+
+def _score_fold(model_path, start, end):
+    registry = model_registry.ModelRegistry(model_path, warmup=False)
+    df = dataset.load_preprocessed()
+    dates = df["dteday"].to_numpy()
+    rows = slice(np.searchsorted(dates, np.datetime64(start), side="left"),
+                 len(dates) if end is None else np.searchsorted(dates, np.datetime64(end), side="left"))
+    fold = df.iloc[rows]
+    predictions = registry.predict(features.model_input(fold))
+    return fold["dteday"].to_numpy(), fold["cnt"].to_numpy(), np.asarray(predictions, dtype=np.float64)
+
+
+def run_backtest(cutoffs=CUTOFFS, workers=None, model_path=model_registry.MODEL_PATH):
+    """Score every fold with the same pretrained model and return the metrics and the predictions."""
+    bounds = fold_bounds(cutoffs)
+    workers = min(workers or os.cpu_count() or 1, len(bounds))
+    if workers == 1:
+        scored = [_score_fold(model_path, start, end) for start, end in bounds]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            scored = list(pool.map(_score_fold, [model_path] * len(bounds),
+                                   *zip(*bounds)))
+    folds = []
+    for (start, end), (dates, actual, predicted) in zip(bounds, scored):
+        fold = {"start": start.isoformat(), "end": end.isoformat() if end is not None else None}
+        fold.update(metrics(actual, predicted))
+        folds.append(fold)
+    dates, actual, predicted = (np.concatenate(arrays) for arrays in zip(*scored))
+    return {"cutoffs": list(cutoffs), "folds": folds, "overall": metrics(actual, predicted),
+            "tolerance": ALMOST_CORRECT_TOLERANCE,
+            "dteday": dates, "actual": actual, "prediction": predicted}
+
+
+def result_key(model_sha, data_sha, cutoffs):
+    spec = json.dumps({"cutoffs": list(cutoffs), "tolerance": ALMOST_CORRECT_TOLERANCE})
+    return "%s-%s-%s" % (model_sha[:16], data_sha[:16], hashlib.sha256(spec.encode()).hexdigest()[:8])
+
+
+def save(key, result):
+    os.makedirs(BACKTEST_DIR, exist_ok=True)
+    stem = os.path.join(BACKTEST_DIR, key)
+    np.savez(stem + ".tmp.npz", dteday=result["dteday"].astype("datetime64[ns]").view(np.int64),
+             actual=result["actual"], prediction=result["prediction"])
+    os.replace(stem + ".tmp.npz", stem + ".npz")
+    summary = {name: value for name, value in result.items() if name not in ("dteday", "actual", "prediction")}
+    with open(stem + ".tmp.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(stem + ".tmp.json", stem + ".json")
+
+
+def load(key):
+    stem = os.path.join(BACKTEST_DIR, key)
+    if not (os.path.exists(stem + ".json") and os.path.exists(stem + ".npz")):
+        return None
+    with open(stem + ".json") as f:
+        result = json.load(f)
+    with np.load(stem + ".npz") as arrays:
+        result["dteday"] = arrays["dteday"].view("datetime64[ns]")
+        result["actual"] = arrays["actual"]
+        result["prediction"] = arrays["prediction"]
+    return result
+
+
+@perf.timed("data.backtest")
+def get_backtest(registry=None, cutoffs=CUTOFFS, workers=1):
+    """Stored backtest for the current model and dataset, running it first if needed."""
+    registry = registry or model_registry.get_registry()
+    key = result_key(registry.checksum, dataset.source_hash(dataset.PREPROCESSED_CSV), cutoffs)
+    result = _results.get(key)
+    if result is None:
+        with _results_lock:
+            result = _results.get(key)
+            if result is None:
+                result = load(key)
+                if result is None:
+                    result = run_backtest(cutoffs, workers, registry.path)
+                    save(key, result)
+                _results[key] = result
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score and store the monthly holdout folds.")
+    parser.add_argument("--cutoffs", nargs="+", default=CUTOFFS, help="fold start dates, ascending")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--model", default=model_registry.MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    registry = model_registry.ModelRegistry(args.model, warmup=False)
+    key = result_key(registry.checksum, dataset.source_hash(dataset.PREPROCESSED_CSV), args.cutoffs)
+    start = time.perf_counter()
+    result = run_backtest(args.cutoffs, args.workers, registry.path)
+    save(key, result)
+    for fold in result["folds"] + [dict(result["overall"], start="overall", end=None)]:
+        print("%-20s rows %5d  R2 %.3f  MAE %6.1f  RMSE %6.1f  almost correct %.1f%%"
+              % (fold["start"][:10], fold["rows"], fold["r2"], fold["mae"], fold["rmse"],
+                 100 * fold["almost_correct"]))
+    print("stored %s in %.1fs" % (key, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
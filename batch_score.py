@@ -0,0 +1,132 @@
+"""Offline batch scoring of scenario files.
+
+Reads a CSV or Parquet file in the raw hourly schema or the preprocessed
+schema in fixed-size chunks, scores the chunks on a process pool and
+appends each scored chunk to the output as soon as it is ready (in input
+order), so memory stays flat regardless of the input size.  The input can
+also be a partitioned dataset (``partitions.py``); ``--systems``,
+``--start`` and ``--end`` then select the partitions that are read.
+
+    python batch_score.py forecasts.csv scored.csv --chunksize 100000 --workers 8
+    python batch_score.py partitioned/ scored.csv --systems dc --start 2012-01-01
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import dataset
+import features
+import model_registry
+
+DEFAULT_CHUNKSIZE = 100_000
+PREDICTION_COLUMN = "prediction"
+
+
+def read_chunks(path, chunksize=DEFAULT_CHUNKSIZE, systems=None, start=None, end=None):
+    """Yield DataFrames of at most ``chunksize`` rows from a CSV or Parquet file.
+
+    A directory is read as a partitioned dataset, filtered by ``systems``
+    and ``[start, end)``; its chunks are whole parts and may be larger.
+    """
+    if os.path.isdir(path):
+        import partitions
+        yield from partitions.scan(path, systems, start, end, columns=partitions.COLUMNS + [partitions.SYSTEM_COLUMN],
+                                   chunksize=chunksize)
+    else:
+        yield from dataset.read_chunks(path, chunksize)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._parquet_writer = None
+
+    def write(self, chunk):
+        if dataset.is_parquet(self.path):
+            import pyarrow as pa
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = dataset._pyarrow_parquet().ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode="w" if self.rows == 0 else "a",
+                         header=self.rows == 0, index=False)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+_registry = None
+
+
+def _init_worker(model_path):
+    global _registry
+    _registry = model_registry.ModelRegistry(model_path, warmup=False)
+
+
+def score_chunk(chunk):
+    """The chunk with a ``prediction`` column appended."""
+    registry = _registry or model_registry.get_registry()
+    scored = chunk.copy()
+    scored[PREDICTION_COLUMN] = registry.predict(features.model_input(chunk))
+    return scored
+
+
+def score_file(input_path, output_path, chunksize=DEFAULT_CHUNKSIZE, workers=None,
+               model_path=model_registry.MODEL_PATH, systems=None, start=None, end=None):
+    """Score ``input_path`` into ``output_path``; returns the number of rows written."""
+    workers = workers or os.cpu_count() or 1
+    writer = ChunkWriter(output_path)
+    chunks = read_chunks(input_path, chunksize, systems, start, end)
+    try:
+        if workers == 1:
+            _init_worker(model_path)
+            for chunk in chunks:
+                writer.write(score_chunk(chunk))
+            return writer.rows
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(model_path,)) as pool:
+            # keep a bounded number of chunks in flight and write them in order
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.submit(score_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    writer.write(pending.popleft().result())
+            while pending:
+                writer.write(pending.popleft().result())
+        return writer.rows
+    finally:
+        writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of scenarios with the rentals model.")
+    parser.add_argument("input", help="CSV or Parquet file, raw hourly or preprocessed schema, "
+                                      "or a partitioned dataset directory")
+    parser.add_argument("output", help="CSV or Parquet file to write (input columns + prediction)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--model", default=model_registry.MODEL_PATH, help="pickled model to score with")
+    parser.add_argument("--systems", nargs="+", help="partitioned input: systems to score (default: all)")
+    parser.add_argument("--start", help="partitioned input: first date to score")
+    parser.add_argument("--end", help="partitioned input: date after the last one to score")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = score_file(args.input, args.output, args.chunksize, args.workers, args.model,
+                      args.systems, args.start, args.end)
+    elapsed = time.perf_counter() - start
+    print("scored %d rows in %.1fs (%.0f rows/s) -> %s"
+          % (rows, elapsed, rows / elapsed if elapsed else 0.0, args.output), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Benchmark suite for the dashboard: data loading, prediction and every page.
+
+    python benchmarks/bench_suite.py --scales 1 4 16 --json bench.json
+    python benchmarks/bench_suite.py --json bench-new.json --compare bench.json
+
+For every scale the two CSVs are enlarged synthetically (each hour repeated
+``scale`` times, the copies with jittered rental counts) into a temporary
+data directory, and a fresh process with an empty cache directory
+(``DASHBOARD_DATA_DIR`` / ``DASHBOARD_CACHE_DIR``) measures:
+
+- loading: plain ``pd.read_csv``, building the column cache, reading it back,
+  and loading the model;
+- prediction: feature building for the whole hourly set, batch throughput,
+  single-row latency of the model and of the cached prediction page path;
+- pages: ``page_summary`` ... ``page_annex`` rendered in Streamlit's bare
+  mode, the first (cold) render and the median warm render, broken down by
+  the ``perf`` spans around data loading, prediction and each figure.
+
+``--compare`` prints the timings that moved by more than ``--threshold``
+(and ``--min-delta-ms``) against an earlier run and exits with status 1 on
+a regression.
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "Group2_GroupAssignment_Streamlit.py")
+
+PAGES = ["page_summary", "page_eda", "page_model", "page_conclusion", "page_annex"]
+COUNT_COLUMNS = ["casual", "registered", "cnt"]
+
+# timing changes smaller than this are noise, whatever the ratio
+MIN_DELTA_MS = 2.0
+
+# the prediction page defaults
+SCENARIO = {"year": 0, "month": 1, "day": 1, "hour": 0, "holiday": 0, "weekday": 0,
+            "weather": 1, "temp": 20, "humidity": 50, "windspeed": 33}
+
+
+def scale_csv(source, target, scale, seed=0):
+    """Write ``source`` with every row repeated ``scale`` times and jittered counts in the copies."""
+    df = pd.read_csv(source)
+    out = df.loc[df.index.repeat(scale)].reset_index(drop=True)
+    copy = np.tile(np.arange(scale), len(df))
+    factor = np.where(copy > 0, np.random.default_rng(seed).uniform(0.8, 1.2, len(out)), 1.0)
+    for column in COUNT_COLUMNS:
+        if column in out:
+            out[column] = np.rint(out[column] * factor).astype(np.int64)
+    if {"casual", "registered", "cnt"} <= set(out.columns):
+        out["cnt"] = out["casual"] + out["registered"]
+    if "instant" in out:
+        out["instant"] = np.arange(1, len(out) + 1)
+    out.to_csv(target, index=False)
+    return len(out)
+
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def _best(function, *args, repeats=3):
+    return min(_timed(function, *args) for _ in range(repeats))
+
+
+def _latency_ms(function, repeats=200):
+    timings = sorted(_timed(function) for _ in range(repeats))
+    return {"p50_ms": 1000 * timings[len(timings) // 2], "p99_ms": 1000 * timings[int(len(timings) * 0.99)]}
+
+
+def _spans(prefixes=("data.", "features.", "model.", "predict.", "figure.")):
+    import perf
+    return {name: round(entry["mean_ms"], 3) for name, entry in perf.stats().items()
+            if name.startswith(prefixes)}
+
+
+def measure(repeats):
+    """All measurements for the data and cache directories set in the environment."""
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    import dataset
+    import features
+    import model_registry
+    import perf
+    import prediction_cache
+
+    hourly = dataset._resolve(dataset.HOURLY_CSV)
+    result = {"load": {}, "predict": {}, "pages": {}}
+    load = result["load"]
+    load["read_csv_seconds"] = _best(pd.read_csv, hourly, repeats=repeats)
+    load["column_cache_build_seconds"] = _timed(dataset.load_hourly)
+    load["column_cache_load_ms"] = 1000 * _best(dataset.load_hourly, repeats=repeats)
+    load["preprocessed_cache_build_seconds"] = _timed(dataset.load_preprocessed)
+    load["model_load_seconds"] = _timed(model_registry.get_registry)
+    registry = model_registry.get_registry()
+    result["rows"] = {"hourly": len(dataset.load_hourly()), "preprocessed": len(dataset.load_preprocessed())}
+
+    predict = result["predict"]
+    raw = dataset.load_hourly()
+    predict["feature_build_ms"] = 1000 * _best(features.build_features, raw, repeats=repeats)
+    X = features.model_input(dataset.load_preprocessed())
+    predict["batch_rows_per_second"] = len(X) / _best(registry.predict, X, repeats=repeats)
+    single = features.scenario_features(**SCENARIO)
+    predict["single_row"] = _latency_ms(lambda: registry.predict(single))
+    predict["single_row_with_features"] = _latency_ms(
+        lambda: registry.predict(features.scenario_features(**SCENARIO)))
+    predict["prediction_page"] = _latency_ms(lambda: prediction_cache.predict_scenario(registry, **SCENARIO))
+
+    logging.disable(logging.WARNING)
+    spec = importlib.util.spec_from_file_location("dashboard_app", APP)
+    app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+    for name in PAGES:
+        page = getattr(app, name)
+        perf.reset()
+        cold = _timed(page)
+        spans_cold = _spans()
+        perf.reset()
+        warm = [_timed(page) for _ in range(repeats)]
+        result["pages"][name] = {
+            "cold_ms": 1000 * cold,
+            "warm_ms": 1000 * statistics.median(warm),
+            "rss_mb": model_registry.rss_bytes() / 2 ** 20,
+            "spans_cold_ms": spans_cold,
+            "spans_warm_ms": _spans(),
+        }
+    return result
+
+
+def run_scale(scale, workdir, repeats):
+    data_dir = os.path.join(workdir, "scale-%d" % scale)
+    cache_dir = os.path.join(data_dir, ".cache")
+    os.makedirs(data_dir, exist_ok=True)
+    for name in ("bike-sharing_hourly.csv", "preprocessed-df.csv"):
+        scale_csv(os.path.join(ROOT, name), os.path.join(data_dir, name), scale)
+    env = dict(os.environ, DASHBOARD_DATA_DIR=data_dir, DASHBOARD_CACHE_DIR=cache_dir, DASHBOARD_PRELOAD="0")
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", "--repeats", str(repeats)],
+                         env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _flatten(tree, prefix=""):
+    flat = {}
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, prefix + key + "/"))
+        elif isinstance(value, (int, float)):
+            flat[prefix + key] = value
+    return flat
+
+
+def _unit(key):
+    """Unit of the timing in a flattened key (ms, seconds or rate); None if it is not a timing."""
+    for part in reversed(key.split("/")):
+        if part.endswith("per_second"):
+            return "rate"
+        if part.endswith(("_ms", "_seconds")):
+            return part.rsplit("_", 1)[1]
+    return None
+
+
+def compare(current, previous, threshold, min_delta_ms=MIN_DELTA_MS):
+    """Timings that moved by more than ``threshold``; returns the regressions."""
+    now, before = _flatten(current["scales"]), _flatten(previous["scales"])
+    regressions = []
+    for key in sorted(now.keys() & before.keys()):
+        unit = _unit(key)
+        if unit is None or not before[key] or not now[key]:
+            continue
+        scale = 1000 if unit == "seconds" else 1
+        if unit != "rate" and abs(now[key] - before[key]) * scale < min_delta_ms:
+            continue
+        # a higher throughput is better, a higher time is worse
+        ratio = before[key] / now[key] if unit == "rate" else now[key] / before[key]
+        if abs(ratio - 1) > threshold:
+            print("%-11s %-70s %10.3f -> %10.3f" % ("regression" if ratio > 1 else "improvement",
+                                                    key, before[key], now[key]))
+            if ratio > 1:
+                regressions.append(key)
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _summary(scale, result):
+    print("scale %d: %d hourly rows" % (scale, result["rows"]["hourly"]))
+    load, predict = result["load"], result["predict"]
+    print("  read_csv %.3fs  cache build %.3fs  cache load %.2f ms  model load %.3fs"
+          % (load["read_csv_seconds"], load["column_cache_build_seconds"], load["column_cache_load_ms"],
+             load["model_load_seconds"]))
+    print("  features %.1f ms  batch %.0f rows/s  single row p50 %.3f ms  prediction page p50 %.3f ms"
+          % (predict["feature_build_ms"], predict["batch_rows_per_second"], predict["single_row"]["p50_ms"],
+             predict["prediction_page"]["p50_ms"]))
+    for name, page in result["pages"].items():
+        slowest = max(page["spans_cold_ms"].items(), key=lambda item: item[1], default=("-", 0))
+        print("  %-16s cold %8.1f ms  warm %8.1f ms  RSS %5.0f MB  slowest span %s (%.1f ms)"
+              % (name, page["cold_ms"], page["warm_ms"], page["rss_mb"], slowest[0], slowest[1]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16],
+                        help="dataset sizes as multiples of the original")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative change to report")
+    parser.add_argument("--min-delta-ms", type=float, default=MIN_DELTA_MS,
+                        help="ignore timing changes smaller than this")
+    parser.add_argument("--workdir", help="where the scaled datasets go (default: a temporary directory)")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        # child process: the data and cache directories come from the environment
+        print(json.dumps(measure(args.repeats)))
+        return 0
+
+    results = {"meta": {"date": datetime.datetime.now().isoformat(timespec="seconds"), "commit": _git_commit(),
+                        "python": platform.python_version(), "machine": platform.machine(),
+                        "cpus": os.cpu_count(), "repeats": args.repeats},
+               "scales": {}}
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for scale in args.scales:
+            result = run_scale(scale, workdir, args.repeats)
+            results["scales"][str(scale)] = result
+            _summary(scale, result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if compare(results, previous, args.threshold, args.min_delta_ms):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Load test for serve.py: p50/p99 latency and throughput with batching on and off.
+
+    python benchmarks/load_test.py --requests 2000 --concurrency 64
+
+Starts a server per configuration on a free local port, sends single-row
+``/predict`` requests over ``--concurrency`` keep-alive connections and
+prints one line per configuration.  Pass ``--url`` to test a server that
+is already running instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def random_scenario(rng):
+    return {"year": rng.randint(0, 1), "month": rng.randint(1, 12), "day": rng.randint(1, 30),
+            "hour": rng.randint(0, 23), "holiday": rng.randint(0, 1), "weekday": rng.randint(0, 6),
+            "weather": rng.randint(1, 4), "temp": rng.randint(0, 41),
+            "humidity": rng.randint(0, 100), "windspeed": rng.randint(0, 67)}
+
+
+async def _client(host, port, bodies, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while bodies:
+            body = bodies.pop()
+            start = time.perf_counter()
+            writer.write(b"POST /predict HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (host.encode(), len(body), body))
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            if b" 200 " not in status:
+                raise RuntimeError("request failed: %r" % status)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, requests, concurrency, seed=0):
+    rng = random.Random(seed)
+    bodies = [json.dumps(random_scenario(rng)).encode() for _ in range(requests)]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, bodies, latencies) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p99_ms": 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "requests_per_second": len(latencies) / elapsed,
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port, process, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited with code %d" % process.returncode)
+        try:
+            urllib.request.urlopen("http://127.0.0.1:%d/health" % port, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start within %ds" % timeout)
+
+
+def run_against_server(window, args):
+    port = _free_port()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "serve.py"), "--port", str(port),
+                                "--batch-window", str(window)], cwd=ROOT, stdout=subprocess.DEVNULL)
+    try:
+        _wait_ready(port, process)
+        asyncio.run(run_load("127.0.0.1", port, min(args.requests, 100), args.concurrency))  # warm-up
+        result = asyncio.run(run_load("127.0.0.1", port, args.requests, args.concurrency))
+        stats = json.loads(urllib.request.urlopen("http://127.0.0.1:%d/stats" % port).read())
+        result["mean_batch_size"] = stats["batching"]["mean_batch_size"]
+        return result
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _print(label, result):
+    print("%-22s %6d req  p50 %7.2f ms  p99 %7.2f ms  %8.1f req/s"
+          % (label, result["requests"], result["p50_ms"], result["p99_ms"], result["requests_per_second"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-window", type=float, default=0.005, help="window for the batching run")
+    parser.add_argument("--url", help="test an already running server instead, e.g. http://127.0.0.1:8502")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.url:
+        url = urllib.parse.urlparse(args.url)
+        results["server"] = asyncio.run(run_load(url.hostname, url.port or 80, args.requests, args.concurrency))
+        _print("server", results["server"])
+    else:
+        for label, window in (("batching off", 0.0), ("batching on", args.batch_window)):
+            results[label] = run_against_server(window, args)
+            _print(label, results[label])
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
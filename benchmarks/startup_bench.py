@@ -0,0 +1,79 @@
+"""Cold-start cost of the dashboard, page by page.
+
+    python benchmarks/startup_bench.py --json startup_bench.json
+
+For every page a fresh interpreter imports the app (as Streamlit would on a
+new replica, background preloading off), renders that page once in
+Streamlit's bare mode and reports the import time, the page's first render
+time, resident memory and which heavy libraries ended up loaded.  On-disk
+caches (.cache/) are used if present; delete them to include cache builds.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = ["page_summary", "page_eda", "page_model", "page_conclusion", "page_annex"]
+HEAVY = ["pandas", "plotly", "matplotlib", "seaborn", "PIL", "catboost", "sklearn", "statsmodels"]
+
+CHILD = r"""
+import importlib.util, json, logging, os, sys, time
+root, app_path, page = sys.argv[1:4]
+os.chdir(root)
+sys.path.insert(0, root)
+os.environ["DASHBOARD_PRELOAD"] = "0"
+logging.disable(logging.WARNING)
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("dashboard_app", app_path)
+app = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(app)
+import_seconds = time.perf_counter() - start
+import_rss = rss()
+start = time.perf_counter()
+if page != "none":
+    getattr(app, page)()
+page_seconds = time.perf_counter() - start
+print(json.dumps({"import_seconds": import_seconds, "import_rss_bytes": import_rss,
+                  "first_render_seconds": page_seconds, "rss_bytes": rss(),
+                  "heavy_modules": sorted(m for m in json.loads(sys.argv[4]) if m in sys.modules)}))
+"""
+
+
+def measure(app_path, page, repeats):
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", CHILD, ROOT, app_path, page, json.dumps(HEAVY)],
+                             capture_output=True, text=True, check=True, cwd=ROOT).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run["import_seconds"] + run["first_render_seconds"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=os.path.join(ROOT, "Group2_GroupAssignment_Streamlit.py"))
+    parser.add_argument("--repeats", type=int, default=3, help="runs per page; the fastest is kept")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for page in ["none"] + PAGES:
+        result = measure(os.path.abspath(args.app), page, args.repeats)
+        results[page] = result
+        print("%-16s import %5.2fs  first render %5.2fs  RSS %5.0f MB  %s"
+              % (page, result["import_seconds"], result["first_render_seconds"],
+                 result["rss_bytes"] / 2 ** 20, ", ".join(result["heavy_modules"]) or "-"))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
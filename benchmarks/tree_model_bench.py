@@ -0,0 +1,112 @@
+"""Parity and performance of the NumPy tree evaluator against the pickled model.
+
+    python benchmarks/tree_model_bench.py --json tree_model_bench.json
+
+Exports the pickle to ``.npz`` if needed, checks that both give the same
+predictions on the preprocessed dataset, then reports cold start (fresh
+process: imports, load and first prediction) with resident memory,
+single-row latency and batch throughput for each engine.
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import dataset  # noqa: E402
+import features  # noqa: E402
+import tree_model  # noqa: E402
+
+# run in a fresh interpreter: only what serving with each engine needs
+COLD_START = r"""
+import os, sys, time
+start = time.perf_counter()
+import numpy as np
+if sys.argv[1] == "pickle":
+    import pickle
+    with open(sys.argv[2], "rb") as f:
+        model = pickle.load(f)
+else:
+    sys.path.insert(0, sys.argv[3])
+    import tree_model
+    model = tree_model.load(sys.argv[2])
+model.predict(np.zeros((1, 15), dtype=np.float32))
+elapsed = time.perf_counter() - start
+with open("/proc/self/statm") as f:
+    rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+print(elapsed, rss, len([m for m in sys.modules if m.split(".")[0] in ("catboost", "sklearn", "pycaret", "pandas")]))
+"""
+
+
+def cold_start(engine, path, repeats=3):
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", COLD_START, engine, path, ROOT],
+                             capture_output=True, text=True, check=True).stdout.split()
+        runs.append((float(out[0]), int(out[1]), int(out[2])))
+    seconds, rss, heavy_modules = min(runs)
+    return {"cold_start_seconds": seconds, "rss_bytes": rss, "training_library_modules": heavy_modules}
+
+
+def latency(model, row, repeats=500):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {"p50_ms": 1000 * timings[len(timings) // 2], "p99_ms": 1000 * timings[int(len(timings) * 0.99)]}
+
+
+def throughput(model, X, repeats=3):
+    best = min(_timed(model.predict, X) for _ in range(repeats))
+    return {"rows": len(X), "rows_per_second": len(X) / best}
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pickle", default=os.path.join(ROOT, "bikeRentalsModel.pkl"))
+    parser.add_argument("--npz", default=os.path.join(ROOT, "bikeRentalsModel.npz"))
+    parser.add_argument("--rows", type=int, default=200_000, help="rows for the throughput test")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.npz):
+        tree_model.export(args.pickle, args.npz)
+    with open(args.pickle, "rb") as f:
+        engines = {"pickle": pickle.load(f), "numpy": tree_model.load(args.npz)}
+
+    X = features.model_input(dataset.load_preprocessed()).to_numpy(dtype=np.float32)
+    expected = engines["pickle"].predict(X)
+    results = {"parity": {"rows": len(X), "max_abs_diff": float(np.abs(engines["numpy"].predict(X) - expected).max())}}
+    print("parity: max |pickle - numpy| = %.3g over %d rows" % (results["parity"]["max_abs_diff"], len(X)))
+
+    batch = np.resize(X, (args.rows, X.shape[1]))
+    for name, model in engines.items():
+        result = cold_start(name, args.pickle if name == "pickle" else args.npz)
+        result.update(latency(model, X[:1]))
+        result.update(throughput(model, batch))
+        results[name] = result
+        print("%-6s cold start %6.3fs  RSS %5.0f MB  1-row p50 %6.3f ms  p99 %6.3f ms  %9.0f rows/s"
+              % (name, result["cold_start_seconds"], result["rss_bytes"] / 2 ** 20,
+                 result["p50_ms"], result["p99_ms"], result["rows_per_second"]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
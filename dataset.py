@@ -0,0 +1,201 @@
+"""Shared, read-only access to the project's CSV datasets.
+
+Each source CSV is parsed once into a compact column cache on disk (one
+``.npy`` file per column, narrow integer / float32 dtypes and a pre-parsed
+``dteday`` column).  The column files are memory-mapped read-only, so every
+Streamlit session in the process shares the same pages instead of holding
+its own parsed copy.  The cache directory is named after the SHA-256 of the
+source file, so editing the CSV rebuilds the cache automatically.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+import perf
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# relative data paths are read from DATA_DIR and everything derived from them
+# is written under CACHE_ROOT; both can be moved, e.g. to benchmark other data
+DATA_DIR = os.environ.get("DASHBOARD_DATA_DIR", BASE_DIR)
+CACHE_ROOT = os.environ.get("DASHBOARD_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+CACHE_DIR = os.path.join(CACHE_ROOT, "datasets")
+
+HOURLY_CSV = "bike-sharing_hourly.csv"
+PREPROCESSED_CSV = "preprocessed-df.csv"
+
+DATE_COLUMN = "dteday"
+MANIFEST = "manifest.json"
+
+_INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+_lock = threading.Lock()
+_tables = {}
+
+
+def _resolve(csv_path):
+    if os.path.isabs(csv_path):
+        return csv_path
+    return os.path.join(DATA_DIR, csv_path)
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _stat_signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _compact(values):
+    # smallest integer type that holds the column, float32 for the rest
+    if values.dtype.kind in "iub":
+        if len(values) == 0:
+            return values.astype(np.int8)
+        lo, hi = values.min(), values.max()
+        for dtype in _INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= lo and hi <= info.max:
+                return values.astype(dtype)
+    if values.dtype.kind == "f":
+        return values.astype(np.float32)
+    return values
+
+
+def _cache_dir(csv_path, sha):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(CACHE_DIR, "%s-%s" % (stem, sha[:16]))
+
+
+def build_cache(csv_path, sha, date_column=DATE_COLUMN):
+    """Parse ``csv_path`` once and write its column cache; returns the cache dir."""
+    target = _cache_dir(csv_path, sha)
+    if os.path.exists(os.path.join(target, MANIFEST)):
+        return target
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    df = pd.read_csv(csv_path)
+    columns = []
+    tmp = tempfile.mkdtemp(prefix=".build-", dir=CACHE_DIR)
+    try:
+        for name in df.columns:
+            if name == date_column:
+                values = pd.to_datetime(df[name]).to_numpy("datetime64[ns]").view(np.int64)
+                kind = "datetime64[ns]"
+            else:
+                values = _compact(df[name].to_numpy())
+                kind = values.dtype.str
+            if values.dtype == object:
+                raise TypeError("column %r of %s is not numeric" % (name, csv_path))
+            np.save(os.path.join(tmp, "%s.npy" % name), values)
+            columns.append({"name": name, "dtype": kind})
+        manifest = {"source": os.path.basename(csv_path), "sha256": sha,
+                    "rows": len(df), "columns": columns}
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # another process finished the same build first
+            if not os.path.exists(os.path.join(target, MANIFEST)):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    _prune_stale(csv_path, target)
+    return target
+
+
+def _prune_stale(csv_path, keep):
+    stem = os.path.splitext(os.path.basename(csv_path))[0] + "-"
+    for entry in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, entry)
+        if entry.startswith(stem) and path != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _open_columns(cache_dir):
+    with open(os.path.join(cache_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+    columns = {}
+    for column in manifest["columns"]:
+        values = np.load(os.path.join(cache_dir, "%s.npy" % column["name"]), mmap_mode="r")
+        if column["dtype"] == "datetime64[ns]":
+            values = values.view("datetime64[ns]")
+        columns[column["name"]] = values
+    return manifest, columns
+
+
+def _table(csv_path):
+    path = _resolve(csv_path)
+    signature = _stat_signature(path)
+    entry = _tables.get(path)
+    if entry is not None and entry["signature"] == signature:
+        return entry
+    with _lock:
+        entry = _tables.get(path)
+        if entry is not None and entry["signature"] == signature:
+            return entry
+        sha = file_sha256(path)
+        if entry is None or entry["sha256"] != sha:
+            with perf.span("data.open_cache"):
+                manifest, columns = _open_columns(build_cache(path, sha))
+            entry = {"sha256": sha, "manifest": manifest, "columns": columns}
+        entry = dict(entry, signature=signature)
+        _tables[path] = entry
+        return entry
+
+
+def load_table(csv_path, columns=None):
+    """Return a DataFrame view over the cached columns of ``csv_path``.
+
+    The frame is new on every call, so callers may add or replace columns,
+    but the underlying arrays are shared and read-only.
+    """
+    with perf.span("data.load"):
+        entry = _table(csv_path)
+        names = columns if columns is not None else list(entry["columns"])
+        return pd.DataFrame({name: entry["columns"][name] for name in names}, copy=False)
+
+
+def source_hash(csv_path):
+    """SHA-256 of the source CSV the current cache was built from."""
+    return _table(csv_path)["sha256"]
+
+
+def load_hourly(columns=None):
+    return load_table(HOURLY_CSV, columns)
+
+
+def load_preprocessed(columns=None):
+    return load_table(PREPROCESSED_CSV, columns)
+
+
+def is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def _pyarrow_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet input/output needs pyarrow: pip install pyarrow")
+    return pq
+
+
+def read_chunks(path, chunksize):
+    """Yield DataFrames of at most ``chunksize`` rows from a CSV or Parquet file."""
+    if is_parquet(path):
+        parquet_file = _pyarrow_parquet().ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
@@ -0,0 +1,87 @@
+"""Server-side downsampling of time series for plotting.
+
+Charts receive at most ``MAX_POINTS`` points per trace for the visible
+window: the series is first cut to the window (a binary search on the
+sorted x values) and then reduced with Largest-Triangle-Three-Buckets,
+which keeps the visual shape of the line, or with min/max bucketing, which
+keeps every bucket's extremes.  A zoomed-in window is therefore drawn at a
+higher resolution than the full history.
+"""
+import numpy as np
+
+MAX_POINTS = 1500
+
+
+def _numeric(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").view(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def window(x, start=None, end=None):
+    """Slice of the sorted array ``x`` with ``start <= x <= end``."""
+    x = np.asarray(x)
+    lo = 0 if start is None else np.searchsorted(x, np.asarray(start, dtype=x.dtype), side="left")
+    hi = len(x) if end is None else np.searchsorted(x, np.asarray(end, dtype=x.dtype), side="right")
+    return slice(int(lo), int(hi))
+
+
+def lttb(x, y, n_out):
+    """Indices of the ``n_out`` points Largest-Triangle-Three-Buckets keeps."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _numeric(x)
+    y = np.asarray(y, dtype=np.float64)
+    # first and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # mean of every bucket, used as the third triangle corner
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    mean_x = np.append(sums_x / sizes, x[-1])
+    mean_y = np.append(sums_y / sizes, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - mean_x[bucket + 1]) * (y[lo:hi] - ay)
+                      - (ax - x[lo:hi]) * (mean_y[bucket + 1] - ay))
+        previous = lo + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax(x, y, n_out):
+    """Indices of the minimum and maximum of ``n_out // 2`` equal buckets, in order."""
+    n = len(x)
+    buckets = n_out // 2
+    if n_out >= n or buckets < 1:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    width = int(np.diff(edges).max())
+    # pad the buckets to a rectangle so arg-min/max run on all of them at once
+    offsets = edges[:-1, None] + np.arange(width)[None, :]
+    valid = offsets < edges[1:, None]
+    block = y[np.minimum(offsets, n - 1)]
+    lows = np.where(valid, block, np.inf).argmin(axis=1) + edges[:-1]
+    highs = np.where(valid, block, -np.inf).argmax(axis=1) + edges[:-1]
+    return np.unique(np.concatenate([lows, highs]))
+
+
+def downsample(x, y, n_out=MAX_POINTS, start=None, end=None, method="lttb"):
+    """``x`` and ``y`` cut to ``[start, end]`` and reduced to at most ``n_out`` points.
+
+    ``x`` must be sorted (numbers or datetimes).
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    cut = window(x, start, end)
+    x, y = x[cut], y[cut]
+    keep = (lttb if method == "lttb" else minmax)(x, y, n_out)
+    return x[keep], y[keep]
@@ -0,0 +1,185 @@
+"""Vectorized feature engineering for the rentals model.
+
+Turns rows in the ``bike-sharing_hourly.csv`` schema (or the scenario
+inputs of the prediction page) into the 15 columns the model was trained
+on.  Everything works on whole arrays, so one call handles a single
+slider scenario or millions of hourly rows.
+"""
+import numpy as np
+import pandas as pd
+
+import perf
+
+MODEL_FEATURES = [
+    "season", "yr", "mnth", "hr", "holiday", "weekday", "workingday",
+    "weathersit", "atemp", "hum", "windspeed", "day", "time_of_day",
+    "comfortable_temp", "comfortable_humidity",
+]
+
+# the prediction page inputs, in slider units (°C, %, km/h)
+SCENARIO_FIELDS = [
+    "year", "month", "day", "hour", "holiday", "weekday", "weather",
+    "temp", "humidity", "windspeed",
+]
+
+# normalisation used by the dataset (see the Tech Annex)
+TEMP_SCALE = 41.0
+HUMIDITY_SCALE = 100.0
+WINDSPEED_SCALE = 67.0
+
+# bump when an encoding changes, so stored predictions (the prediction cube) are rebuilt
+ENCODING_VERSION = 2
+
+# the encodings of preprocessed-df.csv, which the model was trained on:
+# astronomical seasons (1: winter from Dec 21, 2: spring from Mar 21,
+# 3: summer from Jun 21, 4: fall from Sep 23), as in the raw ``season`` column
+_SEASON_STARTS = [(3, 21, 2), (6, 21, 3), (9, 23, 4), (12, 21, 1)]
+
+# times of day label-encoded alphabetically: afternoon (13h-18h) 0,
+# evening (19h-23h) 1, morning (7h-12h) 2, night (0h-6h) 3
+_TIME_OF_DAY_BY_HOUR = np.array([3] * 7 + [2] * 6 + [0] * 6 + [1] * 5, dtype=np.int8)
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if values.dtype.kind != "f":
+        values = values.astype(np.float64)
+    return values
+
+
+def _between(values, low, high):
+    # strictly between, compared in the column's own precision so float32 caches match the CSV
+    values = _as_float(values)
+    cast = values.dtype.type
+    return ((values > cast(low)) & (values < cast(high))).astype(np.int8)
+
+
+def season(month, day):
+    month = np.asarray(month, dtype=np.int64)
+    day = np.asarray(day, dtype=np.int64)
+    result = np.ones(np.broadcast(month, day).shape, dtype=np.int8)
+    for start_month, start_day, value in _SEASON_STARTS:
+        result[(month > start_month) | ((month == start_month) & (day >= start_day))] = value
+    return result
+
+
+def time_of_day(hour):
+    return _TIME_OF_DAY_BY_HOUR[np.asarray(hour, dtype=np.intp)]
+
+
+def comfortable_temp(atemp):
+    return _between(atemp, 0.40, 0.65)
+
+
+def comfortable_humidity(hum):
+    return _between(hum, 0.25, 0.55)
+
+
+def _column(frame, name):
+    return np.asarray(frame[name])
+
+
+def _day(frame):
+    if "day" in frame:
+        return _column(frame, "day").astype(np.int8)
+    dates = frame["dteday"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    return dates.dt.day.to_numpy().astype(np.int8)
+
+
+@perf.timed("features.build")
+def build_features(raw):
+    """Model input for rows in the raw hourly schema.
+
+    ``day`` is taken from a ``day`` column when present, otherwise from
+    ``dteday``.  The index of ``raw`` is kept.
+    """
+    month = _column(raw, "mnth")
+    hour = _column(raw, "hr")
+    day = _day(raw)
+    atemp = _as_float(_column(raw, "atemp"))
+    hum = _as_float(_column(raw, "hum"))
+    columns = {
+        "season": season(month, day),
+        "yr": _column(raw, "yr").astype(np.int8),
+        "mnth": month.astype(np.int8),
+        "hr": hour.astype(np.int8),
+        "holiday": _column(raw, "holiday").astype(np.int8),
+        "weekday": _column(raw, "weekday").astype(np.int8),
+        "workingday": _column(raw, "workingday").astype(np.int8),
+        "weathersit": _column(raw, "weathersit").astype(np.int8),
+        "atemp": atemp,
+        "hum": hum,
+        "windspeed": _as_float(_column(raw, "windspeed")),
+        "day": day,
+        "time_of_day": time_of_day(hour),
+        "comfortable_temp": comfortable_temp(atemp),
+        "comfortable_humidity": comfortable_humidity(hum),
+    }
+    return pd.DataFrame(columns, index=raw.index, columns=MODEL_FEATURES)
+
+
+def scenario_raw(year, month, day, hour, holiday, weekday, weather, temp, humidity, windspeed,
+                 workingday=None):
+    """Raw-schema rows for prediction page inputs; scalars and arrays broadcast.
+
+    ``year`` is 0 for 2011 and 1 for 2012.  ``workingday`` defaults to the
+    page's rule, the negation of ``holiday``; callers that know the real
+    dates pass it.
+    """
+    if workingday is None:
+        workingday = 1 - np.asarray(holiday, dtype=np.int8)
+    values = np.broadcast_arrays(year, month, day, hour, holiday, weekday, weather,
+                                 temp, humidity, windspeed, workingday)
+    year, month, day, hour, holiday, weekday, weather, temp, humidity, windspeed, workingday = (
+        np.atleast_1d(v) for v in values)
+    holiday = holiday.astype(np.int8)
+    return pd.DataFrame({
+        "yr": year.astype(np.int8),
+        "mnth": month.astype(np.int8),
+        "day": day.astype(np.int8),
+        "hr": hour.astype(np.int8),
+        "holiday": holiday,
+        "weekday": weekday.astype(np.int8),
+        "workingday": workingday.astype(np.int8),
+        "weathersit": weather.astype(np.int8),
+        "atemp": temp / TEMP_SCALE,
+        "hum": humidity / HUMIDITY_SCALE,
+        "windspeed": windspeed / WINDSPEED_SCALE,
+    })
+
+
+def scenario_features(year, month, day, hour, holiday, weekday, weather, temp, humidity, windspeed,
+                      workingday=None):
+    """Model input for prediction page inputs; see ``scenario_raw``."""
+    return build_features(scenario_raw(year, month, day, hour, holiday, weekday, weather,
+                                       temp, humidity, windspeed, workingday))
+
+
+def model_input(frame):
+    """Model input for a frame in either the raw or the preprocessed schema.
+
+    Both give the same features for the same hour, except that
+    ``preprocessed-df.csv`` flags 23:00 on the eve of a holiday as a
+    holiday too, which the raw ``holiday`` column does not.
+    """
+    if all(name in frame for name in MODEL_FEATURES):
+        return frame[MODEL_FEATURES]
+    return build_features(frame)
+
+
+def training_frame(raw):
+    """Features plus ``cnt`` and an hourly ``dteday``, for (re)training.
+
+    Gives the rows of ``preprocessed-df.csv``: hours with a humidity of 0
+    (a faulty sensor on 2011-03-10) are dropped, as they were there.
+    """
+    raw = raw.loc[_as_float(_column(raw, "hum")) > 0].reset_index(drop=True)
+    df = build_features(raw)
+    dates = raw["dteday"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    df.insert(0, "dteday", dates + pd.to_timedelta(raw["hr"].astype(np.int64), unit="h"))
+    df["cnt"] = np.asarray(raw["cnt"])
+    return df
@@ -0,0 +1,81 @@
+"""Whole-day and whole-week demand profiles in one batched model call.
+
+A profile covers ``days`` consecutive days from ``start`` hour by hour.
+The hourly weather inputs are in the prediction page units (°C, %, km/h)
+and hold either one value per hour of the profile or a 24-hour template
+that is repeated for every day.  Profiles are cached by their full input
+signature, so going back to a day already viewed costs nothing.
+"""
+import numpy as np
+import pandas as pd
+
+import features
+import perf
+import prediction_cache
+
+PROFILE_CACHE_SIZE = 256
+
+# the model has only seen 2011 (yr=0) and 2012 (yr=1)
+FIRST_YEAR = 2011
+LAST_YEAR = 2012
+
+_profiles = prediction_cache.LRUCache(PROFILE_CACHE_SIZE)
+
+
+def profile_hours(start, days):
+    return pd.date_range(pd.Timestamp(start).normalize(), periods=24 * days, freq="h")
+
+
+def _hourly(values, hours):
+    values = np.asarray(values)
+    if values.ndim == 0:
+        return np.full(hours, values)
+    if len(values) == hours:
+        return values
+    if len(values) == 24:
+        return np.tile(values, hours // 24)
+    raise ValueError("expected 24 or %d hourly values, got %d" % (hours, len(values)))
+
+
+def profile_scenarios(start, days, weather, temp, humidity, windspeed, holidays=()):
+    """Scenario arrays (see ``features.scenario_features``) for every hour of the profile.
+
+    Dates after 2012 use the 2012 year level.  Unlike the single-hour page,
+    the weekday comes from real dates, so weekends are not working days.
+    """
+    hours = profile_hours(start, days)
+    holidays = pd.DatetimeIndex(pd.to_datetime(list(holidays))).normalize()
+    holiday = hours.normalize().isin(holidays)
+    # the dataset counts weekdays from Sunday = 0
+    weekday = (hours.dayofweek.to_numpy() + 1) % 7
+    return {
+        "year": np.clip(hours.year - FIRST_YEAR, 0, LAST_YEAR - FIRST_YEAR),
+        "month": hours.month.to_numpy(),
+        "day": hours.day.to_numpy(),
+        "hour": hours.hour.to_numpy(),
+        "holiday": holiday.astype(np.int8),
+        "weekday": weekday,
+        "weather": _hourly(weather, len(hours)),
+        "temp": _hourly(temp, len(hours)),
+        "humidity": _hourly(humidity, len(hours)),
+        "windspeed": _hourly(windspeed, len(hours)),
+        "workingday": (~np.isin(weekday, (0, 6)) & ~holiday).astype(np.int8),
+    }
+
+
+@perf.timed("predict.profile")
+def forecast_profile(registry, start, days, weather, temp, humidity, windspeed, holidays=()):
+    """DataFrame of ``datetime`` and ``prediction`` for every hour of the profile."""
+    scenario = profile_scenarios(start, days, weather, temp, humidity, windspeed, holidays)
+    key = (registry.checksum, pd.Timestamp(start).normalize(), days) + tuple(
+        tuple(np.asarray(values).tolist()) for values in scenario.values())
+    profile = _profiles.get(key)
+    if profile is None:
+        predictions = registry.predict(features.scenario_features(**scenario))
+        profile = pd.DataFrame({"datetime": profile_hours(start, days), "prediction": predictions})
+        _profiles.put(key, profile)
+    return profile.copy()
+
+
+def stats():
+    return _profiles.stats()
@@ -0,0 +1,173 @@
+"""Process-wide registry for the trained rentals model.
+
+The model (the pickle, or the trees exported to ``.npz`` by
+``tree_model.py``) is loaded once per process and warmed up with a
+prediction so the first user does not pay for lazy initialisation.  When
+the file's checksum changes the new model is loaded on a background thread
+and swapped in atomically; predictions already running keep the model
+object they started with.
+"""
+import hashlib
+import io
+import os
+import pickle
+import resource
+import threading
+import time
+
+import dataset
+import perf
+import tree_model
+
+MODEL_PATH = "bikeRentalsModel.pkl"
+
+# how often (seconds) the file is stat-ed for changes
+CHECK_INTERVAL = 2.0
+
+
+def rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # peak rather than current, but the best that is portable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def warmup_frame():
+    """One representative input row taken from the training data."""
+    df = dataset.load_preprocessed()
+    return df.drop(["cnt", "dteday"], axis=1).head(1)
+
+
+class ModelRegistry:
+    def __init__(self, path=MODEL_PATH, warmup=True, check_interval=CHECK_INTERVAL):
+        # the default model ships with the code, not with the data (DASHBOARD_DATA_DIR);
+        # any other relative path is taken from the working directory, like a CLI argument
+        self.path = os.path.join(dataset.BASE_DIR, path) if path == MODEL_PATH else os.path.abspath(path)
+        self.warmup = warmup
+        self.check_interval = check_interval
+        self._model = None
+        self._checksum = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        self.load_count = 0
+        self.last_load_seconds = None
+        self.last_warmup_seconds = None
+        self.resident_bytes = None
+        self.loaded_at = None
+        self.last_error = None
+
+    def _load(self):
+        signature = dataset._stat_signature(self.path)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        checksum = hashlib.sha256(data).hexdigest()
+        if checksum == self._checksum:
+            self._signature = signature
+            return
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        with perf.span("model.load"):
+            if self.path.endswith(".npz"):
+                # exported trees: NumPy only, see tree_model.py
+                model = tree_model.load(io.BytesIO(data))
+            else:
+                model = pickle.loads(data)
+        load_seconds = time.perf_counter() - start
+        warmup_seconds = None
+        if self.warmup:
+            start = time.perf_counter()
+            model.predict(warmup_frame())
+            warmup_seconds = time.perf_counter() - start
+        # single reference assignment: readers see the old or the new model
+        self._model = model
+        self._checksum = checksum
+        self._signature = signature
+        self.load_count += 1
+        self.last_load_seconds = load_seconds
+        self.last_warmup_seconds = warmup_seconds
+        self.resident_bytes = max(rss_bytes() - rss_before, 0)
+        self.loaded_at = time.time()
+
+    def _maybe_reload(self):
+        if self._model is None:
+            with self._reload_lock:
+                if self._model is None:
+                    self._load()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        if self._reload_lock.locked():
+            return
+        if dataset._stat_signature(self.path) != self._signature:
+            threading.Thread(target=self._reload, daemon=True).start()
+
+    def _reload(self):
+        # callers keep predicting with the current model while this runs
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._load()
+            self.last_error = None
+        except Exception as e:
+            # e.g. a half-written pickle; retried on the next check
+            self.last_error = repr(e)
+        finally:
+            self._reload_lock.release()
+
+    def get(self):
+        """The current model; a changed file is picked up on a later call."""
+        self._maybe_reload()
+        return self._model
+
+    def predict(self, X):
+        model = self.get()
+        with perf.span("model.predict"):
+            return model.predict(X)
+
+    @property
+    def checksum(self):
+        self._maybe_reload()
+        return self._checksum
+
+    def stats(self):
+        return {
+            "path": os.path.basename(self.path),
+            "checksum": self._checksum,
+            "load_count": self.load_count,
+            "last_load_seconds": self.last_load_seconds,
+            "last_warmup_seconds": self.last_warmup_seconds,
+            "resident_bytes": self.resident_bytes,
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+        }
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(path=MODEL_PATH):
+    """The shared registry for ``path``, loading and warming it on first use."""
+    registry = _registries.get(path)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(path)
+            if registry is None:
+                registry = ModelRegistry(path)
+                registry.get()
+                _registries[path] = registry
+    return registry
+
+
+def loaded_registries():
+    """``{path: registry}`` of the registries loaded so far; loads nothing.
+
+    Does not wait for a model that is being loaded.
+    """
+    return dict(_registries)
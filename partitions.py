@@ -0,0 +1,314 @@
+"""Partitioned, out-of-core storage for rental logs of many systems and years.
+
+Raw logs in the ``bike-sharing_hourly.csv`` schema are streamed in chunks
+into a directory partitioned by system, year and month:
+
+    <root>/partitions.json
+    <root>/system=dc/year=2011/month=01/part-<source hash>-<chunk>/<column>.npy
+
+Every part is a column directory in the same format as the dataset caches
+(``dataset.py``): one compact ``.npy`` file per column plus a manifest, read
+back as memory maps.  ``partitions.json`` lists the partitions, their parts
+and date ranges and the source files already ingested; it is replaced
+atomically once a whole source is written, so readers never see half an
+ingest and a source is not ingested twice.
+
+Queries (``scan`` / ``Selection``) prune on the manifest alone: only parts
+of the requested systems whose dates overlap ``[start, end)`` are opened,
+and only the requested columns are read from them.
+
+    python partitions.py ingest logs/dc-2011.csv logs/dc-2012.csv --system dc
+    python partitions.py info
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import dataset
+
+MANIFEST = "partitions.json"
+CHUNKSIZE = 200_000
+
+# the raw hourly schema every log must have
+COLUMNS = ["instant", "dteday", "season", "yr", "mnth", "hr", "holiday", "weekday", "workingday",
+           "weathersit", "temp", "atemp", "hum", "windspeed", "casual", "registered", "cnt"]
+# optional column naming the system of each row; --system names it for the whole file otherwise
+SYSTEM_COLUMN = "system"
+
+_SYSTEM_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+_lock = threading.Lock()
+_manifests = {}
+
+
+def default_root():
+    """The partitioned dataset the app reads, or None to use the CSVs."""
+    return os.environ.get("DASHBOARD_PARTITIONED_ROOT") or None
+
+
+def _empty_manifest():
+    return {"version": 0, "columns": None, "partitions": {}, "sources": {}}
+
+
+def _read_manifest(root):
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return _empty_manifest()
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_manifest(root):
+    """The current manifest of ``root``, re-read when the file changes."""
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return _empty_manifest()
+    signature = dataset._stat_signature(path)
+    entry = _manifests.get(root)
+    if entry is None or entry[0] != signature:
+        with _lock:
+            entry = (signature, _read_manifest(root))
+            _manifests[root] = entry
+    return entry[1]
+
+
+def _write_manifest(root, manifest):
+    tmp = os.path.join(root, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(root, MANIFEST))
+
+
+def _month_bounds(year, month):
+    start = np.datetime64("%04d-%02d" % (year, month), "M")
+    return start.astype("datetime64[ns]"), (start + 1).astype("datetime64[ns]")
+
+
+def _write_part(root, relative, frame, dates):
+    """Write ``frame`` as a column directory at ``root/relative``."""
+    target = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".part-", dir=os.path.dirname(target))
+    try:
+        columns = []
+        for name in frame.columns:
+            if name == dataset.DATE_COLUMN:
+                values, kind = dates.view(np.int64), "datetime64[ns]"
+            else:
+                values = dataset._compact(frame[name].to_numpy())
+                kind = values.dtype.str
+            np.save(os.path.join(tmp, "%s.npy" % name), values)
+            columns.append({"name": name, "dtype": kind})
+        with open(os.path.join(tmp, dataset.MANIFEST), "w") as f:
+            json.dump({"rows": len(frame), "columns": columns}, f)
+        # left over by an interrupted ingest of the same source
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(tmp, target)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _systems_of(chunk, system):
+    if SYSTEM_COLUMN in chunk:
+        systems = chunk.pop(SYSTEM_COLUMN).astype(str).to_numpy()
+    elif system is None:
+        raise ValueError("the log has no %r column; name its system with system=..." % SYSTEM_COLUMN)
+    else:
+        systems = np.full(len(chunk), system, dtype=object)
+    for name in np.unique(systems):
+        if not _SYSTEM_NAME.match(name):
+            raise ValueError("system names may only hold letters, digits, '-' and '_': %r" % name)
+    return systems
+
+
+def ingest(source, root, system=None, chunksize=CHUNKSIZE):
+    """Stream the CSV or Parquet log ``source`` into the partitions under ``root``.
+
+    Memory is bounded by ``chunksize`` rows.  Returns the number of rows
+    written, 0 if the same file was ingested before.  One ingest at a time
+    per ``root``.
+    """
+    sha = dataset.file_sha256(source)
+    os.makedirs(root, exist_ok=True)
+    manifest = _read_manifest(root)
+    if sha in manifest["sources"]:
+        return 0
+    rows = 0
+    added = []
+    for index, chunk in enumerate(dataset.read_chunks(source, chunksize)):
+        systems = _systems_of(chunk, system)
+        missing = [name for name in COLUMNS if name not in chunk]
+        if missing:
+            raise ValueError("%s lacks the columns %s" % (source, ", ".join(missing)))
+        chunk = chunk[COLUMNS]
+        dates = pd.to_datetime(chunk[dataset.DATE_COLUMN]).to_numpy("datetime64[ns]")
+        months = dates.astype("datetime64[M]")
+        groups = pd.DataFrame({"system": systems, "month": months}).groupby(["system", "month"], sort=True).indices
+        for (name, month), positions in groups.items():
+            month = pd.Timestamp(month)
+            relative = "system=%s/year=%04d/month=%02d/part-%s-%05d" % (
+                name, month.year, month.month, sha[:12], index)
+            part_dates = dates[positions]
+            _write_part(root, relative, chunk.iloc[positions], part_dates)
+            added.append((name, month.year, month.month, {
+                "path": relative, "rows": len(positions),
+                "start": int(part_dates.min().view(np.int64)), "end": int(part_dates.max().view(np.int64))}))
+        rows += len(chunk)
+
+    manifest = _read_manifest(root)
+    manifest["columns"] = manifest["columns"] or COLUMNS
+    for name, year, month, part in added:
+        partition = manifest["partitions"].setdefault("%s/%04d/%02d" % (name, year, month), {
+            "system": name, "year": year, "month": month, "rows": 0, "parts": []})
+        partition["rows"] += part["rows"]
+        partition["parts"].append(part)
+    manifest["sources"][sha] = {"path": os.path.basename(source), "system": system, "rows": rows,
+                                "ingested_at": time.time()}
+    manifest["version"] += 1
+    _write_manifest(root, manifest)
+    return rows
+
+
+class Selection:
+    """The rows of some systems between two dates, read partition by partition.
+
+    ``start`` is inclusive and ``end`` exclusive; both apply to ``dteday``.
+    """
+
+    def __init__(self, root, systems=None, start=None, end=None):
+        self.root = root
+        self.systems = tuple(sorted(systems)) if systems else None
+        self.start = None if start is None else pd.Timestamp(start).to_datetime64().astype("datetime64[ns]")
+        self.end = None if end is None else pd.Timestamp(end).to_datetime64().astype("datetime64[ns]")
+
+    @property
+    def key(self):
+        """Changes with the filters and with every ingest into ``root``."""
+        return (self.root, self.systems, str(self.start), str(self.end), load_manifest(self.root)["version"])
+
+    def _overlaps(self, first, last):
+        # first and last are inclusive
+        return (self.start is None or last >= self.start) and (self.end is None or first < self.end)
+
+    def partitions(self):
+        """Manifest entries of the partitions that may hold selected rows."""
+        selected = []
+        for key, partition in sorted(load_manifest(self.root)["partitions"].items()):
+            if self.systems is not None and partition["system"] not in self.systems:
+                continue
+            first, after = _month_bounds(partition["year"], partition["month"])
+            if self._overlaps(first, after - np.timedelta64(1, "ns")):
+                selected.append(partition)
+        return selected
+
+    def parts(self):
+        for partition in self.partitions():
+            for part in partition["parts"]:
+                first, last = (np.datetime64(part[name], "ns") for name in ("start", "end"))
+                if self._overlaps(first, last):
+                    yield partition, part, first, last
+
+    def rows(self):
+        """Upper bound of the selected rows, from the manifest."""
+        return sum(part["rows"] for _, part, _, _ in self.parts())
+
+    def scan(self, columns=None, chunksize=None):
+        """Yield DataFrames of the selected rows, one per part.
+
+        Only ``columns`` are read (all stored columns by default; ask for
+        ``"system"`` to get the system name as a column).  With
+        ``chunksize`` consecutive parts are combined into frames of about
+        that many rows.
+        """
+        manifest = load_manifest(self.root)
+        names = list(columns) if columns is not None else manifest["columns"] or []
+        stored = [name for name in names if name != SYSTEM_COLUMN]
+        pending, pending_rows = [], 0
+        for partition, part, first, last in self.parts():
+            _, arrays = dataset._open_columns(os.path.join(self.root, part["path"]))
+            frame = pd.DataFrame({name: arrays[name] for name in stored}, copy=False)
+            if (self.start is not None and first < self.start) or (self.end is not None and last >= self.end):
+                dates = arrays[dataset.DATE_COLUMN]
+                keep = np.ones(len(dates), dtype=bool)
+                if self.start is not None:
+                    keep &= dates >= self.start
+                if self.end is not None:
+                    keep &= dates < self.end
+                frame = frame.loc[keep].reset_index(drop=True)
+            if SYSTEM_COLUMN in names:
+                frame.insert(names.index(SYSTEM_COLUMN), SYSTEM_COLUMN, partition["system"])
+            if not len(frame):
+                continue
+            if chunksize is None:
+                yield frame
+                continue
+            pending.append(frame)
+            pending_rows += len(frame)
+            if pending_rows >= chunksize:
+                yield pd.concat(pending, ignore_index=True)
+                pending, pending_rows = [], 0
+        if pending:
+            yield pd.concat(pending, ignore_index=True)
+
+    def read(self, columns=None):
+        """All selected rows in one DataFrame."""
+        frames = list(self.scan(columns))
+        if not frames:
+            names = list(columns) if columns is not None else load_manifest(self.root)["columns"] or []
+            return pd.DataFrame(columns=names)
+        return pd.concat(frames, ignore_index=True)
+
+
+def scan(root, systems=None, start=None, end=None, columns=None, chunksize=None):
+    """``Selection(root, systems, start, end).scan(columns, chunksize)``."""
+    return Selection(root, systems, start, end).scan(columns, chunksize)
+
+
+def systems(root):
+    return sorted({partition["system"] for partition in load_manifest(root)["partitions"].values()})
+
+
+def date_range(root, systems=None):
+    """First and last ``dteday`` of ``root`` (of ``systems`` only if given), or None when it is empty."""
+    parts = [part for partition in load_manifest(root)["partitions"].values()
+             if systems is None or partition["system"] in systems for part in partition["parts"]]
+    if not parts:
+        return None
+    return (pd.Timestamp(min(part["start"] for part in parts)),
+            pd.Timestamp(max(part["end"] for part in parts)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest rental logs into the partitioned dataset.")
+    parser.add_argument("command", choices=["ingest", "info"])
+    parser.add_argument("sources", nargs="*", help="CSV or Parquet logs in the hourly schema")
+    parser.add_argument("--root", default=default_root() or os.path.join(dataset.DATA_DIR, "partitioned"))
+    parser.add_argument("--system", help="system of every row, unless the logs have a 'system' column")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="rows read per step")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        for source in args.sources:
+            start = time.perf_counter()
+            rows = ingest(source, args.root, args.system, args.chunksize)
+            print("%s: %s" % (source, "%d rows in %.1fs" % (rows, time.perf_counter() - start)
+                                     if rows else "already ingested"))
+    manifest = load_manifest(args.root)
+    for name in systems(args.root):
+        partitions = [p for p in manifest["partitions"].values() if p["system"] == name]
+        print("%-12s %4d partitions %9d rows  %s .. %s" % (
+            name, len(partitions), sum(p["rows"] for p in partitions),
+            min("%04d-%02d" % (p["year"], p["month"]) for p in partitions),
+            max("%04d-%02d" % (p["year"], p["month"]) for p in partitions)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Lightweight timing spans for the dashboard.
+
+    with perf.span("figure.season"):
+        fig = px.bar(...)
+
+Every span adds its duration to a process-wide counter (calls, total and
+maximum time, and the most recent durations for percentiles).  The counters
+cover every session served by the process and are shown on the hidden
+Performance page (``?page=performance``); ``benchmarks/bench_suite.py``
+reads them to break page renders down.  A span costs a few microseconds;
+set ``DASHBOARD_PERF=0`` to turn them off.
+"""
+import collections
+import contextlib
+import functools
+import os
+import threading
+import time
+
+# durations kept per span for the percentiles
+RECENT = 512
+
+enabled = os.environ.get("DASHBOARD_PERF", "1") != "0"
+
+_lock = threading.Lock()
+_spans = {}
+
+
+def record(name, seconds, failed=False):
+    with _lock:
+        entry = _spans.get(name)
+        if entry is None:
+            entry = _spans[name] = {"count": 0, "errors": 0, "total": 0.0, "max": 0.0,
+                                    "recent": collections.deque(maxlen=RECENT)}
+        entry["count"] += 1
+        entry["errors"] += failed
+        entry["total"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        entry["recent"].append(seconds)
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time the block and add it to the counters of ``name``."""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        record(name, time.perf_counter() - start, failed)
+
+
+def timed(name):
+    """Decorator form of ``span``: time every call of the function."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _percentile(ordered, q):
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def stats():
+    """Counters per span name, in milliseconds, the most expensive in total first."""
+    with _lock:
+        entries = {name: dict(entry, recent=sorted(entry["recent"])) for name, entry in _spans.items()}
+    result = {}
+    for name, entry in sorted(entries.items(), key=lambda item: -item[1]["total"]):
+        recent = entry["recent"]
+        result[name] = {
+            "count": entry["count"],
+            "errors": entry["errors"],
+            "total_ms": 1000 * entry["total"],
+            "mean_ms": 1000 * entry["total"] / entry["count"],
+            "p50_ms": 1000 * _percentile(recent, 0.5),
+            "p95_ms": 1000 * _percentile(recent, 0.95),
+            "max_ms": 1000 * entry["max"],
+        }
+    return result
+
+
+def reset():
+    with _lock:
+        _spans.clear()
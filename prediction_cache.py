@@ -0,0 +1,213 @@
+"""Memoised predictions for the what-if page.
+
+Every input on the prediction page is discrete, so predictions are cached
+in a bounded LRU keyed on the model checksum plus the normalised inputs.
+On top of that, an optional precomputed cube holds the predictions for
+every hour x weather x month on a fixed grid of temperatures and
+humidities (the other inputs at their page defaults); it is stored as one
+float32 ``.npy`` file per model checksum and memory-mapped at startup, so
+the most common slider moves are a single array lookup.
+
+    python prediction_cache.py build-cube
+"""
+import argparse
+import collections
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import dataset
+import features
+import model_registry
+import perf
+
+CUBE_DIR = os.path.join(dataset.CACHE_ROOT, "prediction_cube")
+
+# axis name -> (first value, step, count); names follow features.SCENARIO_FIELDS
+CUBE_AXES = collections.OrderedDict([
+    ("hour", (0, 1, 24)),
+    ("weather", (1, 1, 4)),
+    ("month", (1, 1, 12)),
+    ("temp", (0, 1, 42)),
+    ("humidity", (0, 5, 21)),
+])
+
+# the remaining inputs, at the prediction page defaults
+CUBE_FIXED = {"year": 0, "day": 1, "holiday": 0, "weekday": 0, "windspeed": 33}
+
+LRU_SIZE = 4096
+
+
+class LRUCache:
+    """A small thread-safe LRU mapping with hit/miss counters."""
+
+    def __init__(self, maxsize=LRU_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses}
+
+
+_lru = LRUCache()
+_cubes = {}
+_cube_lock = threading.Lock()
+cube_hits = 0
+
+
+def scenario_key(scenario):
+    """Hashable, normalised key for one set of page inputs.
+
+    The inputs determine the feature row one-to-one, so this avoids building
+    the feature frame just to look a prediction up.
+    """
+    return tuple(int(scenario[name]) for name in features.SCENARIO_FIELDS)
+
+
+def _cube_paths(checksum):
+    stem = os.path.join(CUBE_DIR, checksum[:16])
+    return stem + ".npy", stem + ".json"
+
+
+def cube_scenarios():
+    """Scenario arrays for every cube cell, in C order of the cube axes."""
+    grids = [start + step * np.arange(count) for start, step, count in CUBE_AXES.values()]
+    mesh = np.meshgrid(*grids, indexing="ij")
+    scenario = {name: values.ravel() for name, values in zip(CUBE_AXES, mesh)}
+    scenario.update(CUBE_FIXED)
+    return scenario
+
+
+def build_cube(registry, batch_size=200_000):
+    """Score every cube cell with the registry's current model and save the cube."""
+    checksum = registry.checksum
+    model = registry.get()
+    scenario = cube_scenarios()
+    cells = len(scenario["hour"])
+    cube = np.empty(cells, dtype=np.float32)
+    for start in range(0, cells, batch_size):
+        part = {name: (values[start:start + batch_size] if isinstance(values, np.ndarray) else values)
+                for name, values in scenario.items()}
+        X = features.scenario_features(**part)
+        cube[start:start + batch_size] = model.predict(X)
+    cube = cube.reshape([count for _, _, count in CUBE_AXES.values()])
+
+    os.makedirs(CUBE_DIR, exist_ok=True)
+    npy_path, manifest_path = _cube_paths(checksum)
+    tmp = npy_path + ".tmp.npy"
+    np.save(tmp, cube)
+    os.replace(tmp, npy_path)
+    with open(manifest_path, "w") as f:
+        json.dump({"model_sha256": checksum, "axes": CUBE_AXES, "fixed": CUBE_FIXED,
+                   "features": features.ENCODING_VERSION, "built_at": time.time()}, f, indent=2)
+    return npy_path
+
+
+def load_cube(checksum):
+    """The memory-mapped cube for a model checksum, or None if it was never built."""
+    cube = _cubes.get(checksum)
+    if cube is not None:
+        return cube
+    npy_path, manifest_path = _cube_paths(checksum)
+    if not (os.path.exists(npy_path) and os.path.exists(manifest_path)):
+        return None
+    with _cube_lock:
+        if checksum not in _cubes:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            # a cube built for a different grid or feature encoding is ignored until rebuilt
+            if manifest["axes"] != {k: list(v) for k, v in CUBE_AXES.items()} \
+                    or manifest["fixed"] != CUBE_FIXED \
+                    or manifest.get("features") != features.ENCODING_VERSION:
+                return None
+            _cubes[checksum] = np.load(npy_path, mmap_mode="r")
+        return _cubes[checksum]
+
+
+def cube_lookup(cube, scenario):
+    """The cube prediction for ``scenario``, or None if it lies outside the cube."""
+    for name, value in CUBE_FIXED.items():
+        if scenario[name] != value:
+            return None
+    index = []
+    for name, (start, step, count) in CUBE_AXES.items():
+        offset, remainder = divmod(scenario[name] - start, step)
+        if remainder or not 0 <= offset < count:
+            return None
+        index.append(int(offset))
+    return float(cube[tuple(index)])
+
+
+@perf.timed("predict.scenario")
+def predict_scenario(registry, year, month, day, hour, holiday, weekday, weather,
+                     temp, humidity, windspeed):
+    """Prediction for one set of page inputs, served from the cube or the LRU when possible."""
+    global cube_hits
+    scenario = {"year": year, "month": month, "day": day, "hour": hour, "holiday": holiday,
+                "weekday": weekday, "weather": weather, "temp": temp, "humidity": humidity,
+                "windspeed": windspeed}
+    checksum = registry.checksum
+    cube = load_cube(checksum)
+    if cube is not None:
+        prediction = cube_lookup(cube, scenario)
+        if prediction is not None:
+            cube_hits += 1
+            return prediction
+    key = (checksum,) + scenario_key(scenario)
+    prediction = _lru.get(key)
+    if prediction is None:
+        prediction = float(registry.predict(features.scenario_features(**scenario))[0])
+        _lru.put(key, prediction)
+    return prediction
+
+
+def stats():
+    return {"lru": _lru.stats(), "cube_hits": cube_hits,
+            "cubes_loaded": sorted(k[:16] for k in _cubes)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the precomputed prediction cube.")
+    parser.add_argument("command", choices=["build-cube"])
+    parser.add_argument("--model", default=model_registry.MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    path = build_cube(model_registry.get_registry(args.model))
+    print("wrote %s in %.1fs" % (path, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Background warm-up for the dashboard.
+
+The app imports its heavy libraries and loads the model only inside the
+pages that need them, so a new replica renders its first page quickly.
+Once that page is out, ``start`` imports the rest and warms the model,
+prediction cube, aggregate store and backtest on a daemon thread, so the
+other pages are ready by the time someone opens them.  Set
+``DASHBOARD_PRELOAD=0`` to turn it off.
+"""
+import importlib
+import os
+import threading
+import time
+
+MODULES = [
+    "pandas", "plotly.express", "plotly.graph_objects",
+    "dataset", "features", "model_registry", "prediction_cache", "forecast",
+    "aggregates", "trendlines", "downsample", "backtest", "partitions",
+]
+
+# seconds spent on every step, for the benchmarks and the curious
+timings = {}
+error = None
+done = threading.Event()
+
+_started = False
+_lock = threading.Lock()
+
+
+def enabled():
+    return os.environ.get("DASHBOARD_PRELOAD", "1") != "0"
+
+
+def _step(name, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    timings[name] = time.perf_counter() - start
+    return result
+
+
+def _run():
+    global error
+    try:
+        for name in MODULES:
+            _step("import " + name, importlib.import_module, name)
+        import aggregates
+        import backtest
+        import model_registry
+        import prediction_cache
+        registry = _step("model", model_registry.get_registry)
+        _step("prediction cube", prediction_cache.load_cube, registry.checksum)
+        _step("aggregate store", aggregates.load_store)
+        _step("backtest", backtest.get_backtest, registry)
+    except Exception as e:
+        # the pages load whatever is missing themselves
+        error = repr(e)
+    finally:
+        done.set()
+
+
+def start():
+    """Start the warm-up thread once per process."""
+    global _started
+    if _started or not enabled():
+        return
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_run, name="dashboard-preload", daemon=True).start()
@@ -0,0 +1,325 @@
+"""Local HTTP inference service for the rentals model (standard library only).
+
+    python serve.py --port 8502
+
+Endpoints (JSON in, JSON out):
+
+- ``POST /predict``        one row -> ``{"prediction": float}``
+- ``POST /predict/batch``  ``{"rows": [...]}`` -> ``{"predictions": [...]}``
+- ``GET /stats``           model registry, batching and timing-span counters
+- ``GET /health``
+
+A row holds either the prediction page inputs (``features.SCENARIO_FIELDS``,
+in slider units) or the columns of the raw hourly / preprocessed schema.
+A row with a missing, null or out-of-range field is answered with 400 on
+its own, whether it was sent alone or batched with others.
+Concurrent ``/predict`` requests arriving within ``--batch-window`` seconds
+are scored together in one ``predict`` call; ``--batch-window 0`` turns
+batching off.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import features
+import model_registry
+import perf
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8502
+BATCH_WINDOW = 0.005
+MAX_BATCH = 1024
+MAX_BODY = 64 << 20
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# raw hourly schema fields; the day comes from ``day`` or else ``dteday``
+RAW_FIELDS = ["yr", "mnth", "hr", "holiday", "weekday", "workingday", "weathersit", "atemp", "hum", "windspeed"]
+
+# inclusive ranges of the integer-coded fields; they index lookup tables, so nothing outside may pass
+CODES = {
+    "year": (0, 1), "month": (1, 12), "day": (1, 31), "hour": (0, 23), "holiday": (0, 1),
+    "weekday": (0, 6), "weather": (1, 4),
+    "season": (1, 4), "yr": (0, 1), "mnth": (1, 12), "hr": (0, 23), "workingday": (0, 1),
+    "weathersit": (1, 4), "time_of_day": (0, 3), "comfortable_temp": (0, 1), "comfortable_humidity": (0, 1),
+}
+
+
+@functools.lru_cache(maxsize=64)
+def _schema(keys):
+    """Name and fields of the schema of a row with the fields ``keys``."""
+    raw = RAW_FIELDS + (["day"] if "day" in keys or "dteday" not in keys else ["dteday"])
+    schemas = [("scenario", features.SCENARIO_FIELDS), ("preprocessed", features.MODEL_FEATURES), ("raw", raw)]
+    missing = []
+    for name, fields in schemas:
+        missing.append([field for field in fields if field not in keys])
+        if not missing[-1]:
+            return name, tuple(fields)
+    # the schema the row is the fewest fields short of
+    return None, tuple(min(missing, key=len))
+
+
+def _validate(frame, fields):
+    """Raise for the first row with a null, non-numeric or out-of-range field."""
+    for name in fields:
+        if name == "dteday":
+            bad = pd.to_datetime(frame[name], errors="coerce").isna().to_numpy()
+            expected = "a date"
+        else:
+            values = pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=np.float64)
+            bad = ~np.isfinite(values)
+            expected = "a number"
+            if name in CODES:
+                low, high = CODES[name]
+                with np.errstate(invalid="ignore"):
+                    bad |= (values != np.round(values)) | (values < low) | (values > high)
+                expected = "an integer from %d to %d" % (low, high)
+        if bad.any():
+            position = int(np.flatnonzero(bad)[0])
+            value = frame[name].iloc[[position]].tolist()[0]
+            if not np.isscalar(value):
+                # a list or an object; None (and NaN) is reported as null
+                value = None if value is None else repr(value)
+            elif pd.isna(value):
+                value = None
+            raise RequestError(400, "row %d: %r must be %s, got %s"
+                               % (frame.index[position], name, expected, json.dumps(value, default=str)))
+
+
+def rows_to_features(rows):
+    """Model input for a list of JSON rows.
+
+    Every row is checked on its own (a missing, null or out-of-range field
+    fails with the row's position) and rows of different schemas are
+    turned into features separately, so one row never fills in another.
+    """
+    if not rows or not all(isinstance(row, dict) for row in rows):
+        raise RequestError(400, "expected a non-empty list of JSON objects")
+    groups = {}
+    for position, row in enumerate(rows):
+        schema, fields = _schema(frozenset(row))
+        if schema is None:
+            raise RequestError(400, "row %d: missing %s" % (position, ", ".join(map(repr, fields))))
+        groups.setdefault((schema, fields), []).append(position)
+    parts = []
+    for (schema, fields), positions in groups.items():
+        frame = pd.DataFrame([rows[p] for p in positions] if len(groups) > 1 else rows,
+                             index=positions, columns=list(fields))
+        _validate(frame, fields)
+        try:
+            if schema == "scenario":
+                X = features.scenario_features(*(frame[name].to_numpy() for name in features.SCENARIO_FIELDS))
+                X.index = frame.index
+            else:
+                X = features.model_input(frame)
+        except (KeyError, ValueError, TypeError, IndexError) as e:
+            raise RequestError(400, "invalid rows: %s" % e)
+        parts.append(X)
+    if len(parts) == 1:
+        return parts[0].reset_index(drop=True)
+    return pd.concat(parts).sort_index().reset_index(drop=True)
+
+
+class MicroBatcher:
+    """Collects single-row requests for up to ``window`` seconds and scores them together."""
+
+    def __init__(self, registry, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.registry = registry
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.rows = 0
+        self._queue = None
+        self._worker = None
+
+    def _predict(self, X):
+        self.batches += 1
+        self.rows += len(X)
+        return self.registry.predict(X)
+
+    async def predict_many(self, rows):
+        X = rows_to_features(rows)
+        loop = asyncio.get_running_loop()
+        return list(await loop.run_in_executor(None, self._predict, X))
+
+    async def predict_one(self, row):
+        if self.window <= 0:
+            return (await self.predict_many([row]))[0]
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    def _batch_features(self, items):
+        # one frame for the whole batch; if a row is bad, fail only that row
+        try:
+            return rows_to_features([row for row, _ in items]), items
+        except RequestError:
+            good, frames = [], []
+            for row, future in items:
+                try:
+                    frames.append(rows_to_features([row]))
+                    good.append((row, future))
+                except RequestError as e:
+                    future.set_exception(e)
+            if not frames:
+                return None, []
+            return pd.concat(frames, ignore_index=True), good
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            batch = items
+            # whatever goes wrong, answer this batch and keep serving the next ones
+            try:
+                deadline = loop.time() + self.window
+                while len(items) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                X, items = self._batch_features(items)
+                if X is None:
+                    continue
+                predictions = await loop.run_in_executor(None, self._predict, X)
+                for (_, future), prediction in zip(items, predictions):
+                    if not future.done():
+                        future.set_result(float(prediction))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self):
+        return {
+            "window_seconds": self.window,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else None,
+        }
+
+
+class InferenceServer:
+    def __init__(self, registry, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.registry = registry
+        self.batcher = MicroBatcher(registry, window, max_batch)
+        self.requests = 0
+        self.started_at = time.time()
+
+    async def handle(self, method, path, body):
+        if path == "/health":
+            return {"status": "ok"}
+        if path == "/stats":
+            return {"requests": self.requests, "uptime_seconds": time.time() - self.started_at,
+                    "model": self.registry.stats(), "batching": self.batcher.stats(), "spans": perf.stats()}
+        if path not in ("/predict", "/predict/batch"):
+            raise RequestError(404, "unknown path %s" % path)
+        if method != "POST":
+            raise RequestError(405, "use POST for %s" % path)
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError as e:
+            raise RequestError(400, "invalid JSON: %s" % e)
+        if path == "/predict":
+            return {"prediction": await self.batcher.predict_one(payload)}
+        rows = payload.get("rows") if isinstance(payload, dict) else payload
+        if not isinstance(rows, list):
+            raise RequestError(400, 'expected {"rows": [...]}')
+        return {"predictions": [float(p) for p in await self.batcher.predict_many(rows)]}
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                self.requests += 1
+                try:
+                    try:
+                        length = int(headers.get("content-length") or 0)
+                    except ValueError:
+                        length = -1
+                    if length < 0:
+                        # the body cannot be skipped, so the connection is closed after the reply
+                        keep_alive = False
+                        raise RequestError(400, "invalid Content-Length")
+                    if length > MAX_BODY:
+                        keep_alive = False
+                        raise RequestError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, result = 200, await self.handle(method, target.split("?", 1)[0], body)
+                except RequestError as e:
+                    status, result = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, result = 500, {"error": repr(e)}
+                payload = json.dumps(result).encode()
+                writer.write(("HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n"
+                              "Content-Length: %d\r\nConnection: %s\r\n\r\n"
+                              % (status, _REASONS[status], len(payload),
+                                 "keep-alive" if keep_alive else "close")).encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve rentals predictions over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--batch-window", type=float, default=BATCH_WINDOW,
+                        help="seconds to collect /predict requests into one batch (0 disables batching)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--model", default=model_registry.MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    server = InferenceServer(model_registry.get_registry(args.model), args.batch_window, args.max_batch)
+    print("serving on http://%s:%d (batch window %.1f ms)"
+          % (args.host, args.port, args.batch_window * 1000), flush=True)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Selection stores: one build per selection, without holding up other selections."""
+import os
+import threading
+import time
+
+import pandas as pd
+
+import aggregates
+import dataset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROWS = pd.read_csv(os.path.join(ROOT, dataset.HOURLY_CSV), nrows=24)
+
+
+class SlowSelection:
+    def __init__(self, name, seconds=0.0):
+        self.key = ("test", name)
+        self.seconds = seconds
+        self.scans = 0
+
+    def scan(self):
+        self.scans += 1
+        time.sleep(self.seconds)
+        yield ROWS
+
+
+def test_a_slow_build_does_not_block_other_selections():
+    slow, fast = SlowSelection("slow", seconds=1.0), SlowSelection("fast")
+    builder = threading.Thread(target=aggregates.load_selection_store, args=(slow,))
+    builder.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    aggregates.load_selection_store(fast)
+    assert time.perf_counter() - start < 0.5
+    builder.join()
+
+
+def test_concurrent_callers_share_one_build():
+    selection = SlowSelection("shared", seconds=0.3)
+    stores = []
+    threads = [threading.Thread(target=lambda: stores.append(aggregates.load_selection_store(selection)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert selection.scans == 1
+    assert all(store is stores[0] for store in stores)
+
+
+def test_selection_stores_are_bounded():
+    for index in range(aggregates.SELECTION_STORES + 3):
+        aggregates.load_selection_store(SlowSelection("bounded-%d" % index))
+    assert len(aggregates._selection_stores) == aggregates.SELECTION_STORES
+    assert ("test", "bounded-0") not in aggregates._selection_stores
@@ -0,0 +1,35 @@
+"""Scoring the raw hourly schema and the preprocessed schema gives the same predictions."""
+import os
+
+import numpy as np
+import pandas as pd
+
+import batch_score
+import dataset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _hours(scored):
+    # preprocessed-df.csv has the hour in dteday already
+    hours = pd.to_datetime(scored["dteday"]).dt.normalize() + pd.to_timedelta(scored["hr"], unit="h")
+    return scored.set_index(hours)
+
+
+def test_raw_and_preprocessed_schemas_score_the_same(tmp_path):
+    scored = {}
+    for name in (dataset.HOURLY_CSV, dataset.PREPROCESSED_CSV):
+        output = str(tmp_path / name)
+        batch_score.score_file(os.path.join(ROOT, name), output, chunksize=5000, workers=1)
+        scored[name] = _hours(pd.read_csv(output))
+    raw, preprocessed = scored[dataset.HOURLY_CSV], scored[dataset.PREPROCESSED_CSV]
+
+    common = raw.index.intersection(preprocessed.index)
+    assert len(common) == len(preprocessed) == 17357
+    raw, preprocessed = raw.loc[common], preprocessed.loc[common]
+    # preprocessed-df.csv also flags 23:00 on the eve of a holiday; those hours get other features
+    same = raw["holiday"].to_numpy() == preprocessed["holiday"].to_numpy()
+    assert (~same).sum() == 21
+    np.testing.assert_allclose(raw.loc[same, batch_score.PREDICTION_COLUMN].to_numpy(),
+                               preprocessed.loc[same, batch_score.PREDICTION_COLUMN].to_numpy(),
+                               rtol=1e-9, atol=1e-6)
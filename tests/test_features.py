@@ -0,0 +1,138 @@
+"""The feature pipeline against the encodings the model was trained on (preprocessed-df.csv)."""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset
+import features
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def hourly():
+    return pd.read_csv(os.path.join(ROOT, dataset.HOURLY_CSV))
+
+
+@pytest.fixture(scope="module")
+def preprocessed():
+    return pd.read_csv(os.path.join(ROOT, dataset.PREPROCESSED_CSV))
+
+
+@pytest.fixture(scope="module")
+def matched(hourly, preprocessed):
+    """Features built from the raw rows and the training rows, for the same hours."""
+    raw_hours = pd.to_datetime(hourly["dteday"]) + pd.to_timedelta(hourly["hr"], unit="h")
+    positions = pd.Series(np.arange(len(hourly)), index=raw_hours)
+    rows = positions.reindex(pd.to_datetime(preprocessed["dteday"]))
+    assert rows.notna().all()
+    built = features.build_features(hourly).iloc[rows.to_numpy(dtype=np.int64)].reset_index(drop=True)
+    return built, preprocessed
+
+
+def _scenario(**inputs):
+    defaults = {"year": 0, "month": 1, "day": 1, "hour": 0, "holiday": 0, "weekday": 1,
+                "weather": 1, "temp": 20, "humidity": 50, "windspeed": 33}
+    defaults.update(inputs)
+    return features.scenario_features(**defaults)
+
+
+def test_build_features_matches_training_file(matched):
+    built, preprocessed = matched
+    for name in features.MODEL_FEATURES:
+        if name == "holiday":
+            continue
+        np.testing.assert_array_equal(built[name].to_numpy(), preprocessed[name].to_numpy(), err_msg=name)
+
+
+def test_holiday_differs_only_on_holiday_eves(matched):
+    # preprocessed-df.csv also flags 23:00 on the eve of a holiday
+    built, preprocessed = matched
+    differs = built["holiday"].to_numpy() != preprocessed["holiday"].to_numpy()
+    assert (preprocessed.loc[differs, "hr"] == 23).all()
+    assert (preprocessed.loc[differs, "holiday"] == 1).all()
+    assert differs.sum() == 21
+
+
+def test_column_cache_gives_the_same_features(hourly):
+    pd.testing.assert_frame_equal(features.build_features(dataset.load_hourly()),
+                                  features.build_features(hourly), check_dtype=False)
+
+
+def test_season_for_every_month_and_day(preprocessed):
+    dates = pd.to_datetime(preprocessed["dteday"])
+    expected = preprocessed.groupby([dates.dt.month, dates.dt.day])["season"].unique()
+    for (month, day), seasons in expected.items():
+        assert len(seasons) == 1
+        assert _scenario(month=month, day=day)["season"].item() == seasons[0], (month, day)
+
+
+def test_time_of_day_for_every_hour(preprocessed):
+    expected = preprocessed.groupby("hr")["time_of_day"].unique()
+    assert list(expected.index) == list(range(24))
+    for hour, values in expected.items():
+        assert len(values) == 1
+        assert _scenario(hour=hour)["time_of_day"].item() == values[0], hour
+
+
+@pytest.mark.parametrize("column, feature, slider, scale", [
+    ("atemp", "comfortable_temp", "temp", features.TEMP_SCALE),
+    ("hum", "comfortable_humidity", "humidity", features.HUMIDITY_SCALE),
+])
+def test_comfort_flags_for_every_slider_value(preprocessed, column, feature, slider, scale):
+    comfortable = preprocessed.loc[preprocessed[feature] == 1, column]
+    below = preprocessed.loc[(preprocessed[feature] == 0) & (preprocessed[column] < comfortable.min()), column]
+    above = preprocessed.loc[(preprocessed[feature] == 0) & (preprocessed[column] > comfortable.max()), column]
+    for value in range(int(scale) + 1):
+        level = value / scale
+        if comfortable.min() <= level <= comfortable.max():
+            expected = 1
+        elif level <= below.max() or level >= above.min():
+            expected = 0
+        else:
+            pytest.fail("the training data does not settle %s = %d" % (slider, value))
+        assert _scenario(**{slider: value})[feature].item() == expected, value
+
+
+def test_scenario_slider_grid_in_one_call():
+    temps, humidities = np.meshgrid(np.arange(42), np.arange(101), indexing="ij")
+    built = _scenario(temp=temps.ravel(), humidity=humidities.ravel())
+    assert len(built) == temps.size
+    np.testing.assert_array_equal(built["comfortable_humidity"].to_numpy(),
+                                  ((humidities.ravel() > 25) & (humidities.ravel() < 55)).astype(np.int8))
+
+
+def test_row_count_scaling(hourly):
+    base = features.build_features(hourly)
+    repeats = 60  # about a million rows
+    big = pd.concat([hourly] * repeats, ignore_index=True)
+
+    def best(frame):
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            result = features.build_features(frame)
+            timings.append(time.perf_counter() - start)
+        return result, min(timings)
+
+    built, big_seconds = best(big)
+    _, base_seconds = best(hourly)
+    assert len(built) == len(big)
+    pd.testing.assert_frame_equal(built, pd.concat([base] * repeats, ignore_index=True))
+    # vectorized: the cost per row does not grow with the number of rows
+    assert big_seconds / len(big) < 3 * base_seconds / len(hourly)
+
+
+def test_training_frame_reproduces_training_file(hourly, preprocessed):
+    frame = features.training_frame(hourly)
+    assert list(frame.columns) == ["dteday"] + features.MODEL_FEATURES + ["cnt"]
+    assert len(frame) == len(preprocessed)
+    np.testing.assert_array_equal(frame["dteday"].to_numpy(), pd.to_datetime(preprocessed["dteday"]).to_numpy())
+    for name in features.MODEL_FEATURES + ["cnt"]:
+        if name == "holiday":
+            assert (frame[name].to_numpy() != preprocessed[name].to_numpy()).sum() == 21
+            continue
+        np.testing.assert_array_equal(frame[name].to_numpy(), preprocessed[name].to_numpy(), err_msg=name)
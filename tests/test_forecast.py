@@ -0,0 +1,31 @@
+"""Day and week profiles get the calendar features of the real dates."""
+import os
+
+import numpy as np
+import pandas as pd
+
+import dataset
+import features
+import forecast
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_profile_calendar_matches_the_dataset():
+    hourly = pd.read_csv(os.path.join(ROOT, dataset.HOURLY_CSV))
+    dates = pd.to_datetime(hourly["dteday"])
+    holidays = dates[hourly["holiday"] == 1].unique()
+    scenario = forecast.profile_scenarios("2011-01-01", 731, weather=1, temp=20, humidity=50, windspeed=10,
+                                          holidays=holidays)
+    profile = features.scenario_raw(**scenario).set_index(forecast.profile_hours("2011-01-01", 731))
+    profile = profile.loc[dates + pd.to_timedelta(hourly["hr"], unit="h")]
+    for name in ("yr", "mnth", "hr", "holiday", "weekday", "workingday"):
+        np.testing.assert_array_equal(profile[name].to_numpy(), hourly[name].to_numpy(), err_msg=name)
+
+
+def test_weekends_are_not_working_days():
+    # 2012-06-09 is a Saturday, 2012-06-10 a Sunday
+    scenario = forecast.profile_scenarios("2012-06-08", 3, weather=1, temp=20, humidity=50, windspeed=10)
+    workingday = scenario["workingday"].reshape(3, 24)
+    assert (workingday[0] == 1).all()
+    assert (workingday[1:] == 0).all()
@@ -0,0 +1,64 @@
+"""Model path resolution and checksum-based hot reload."""
+import os
+import threading
+import time
+
+import numpy as np
+
+import dataset
+import model_registry
+import tree_model
+
+
+def _save(path, leaf):
+    tree_model.TreeEnsemble(["x"], [[0]], [[0.5]], [[leaf, leaf]]).save(str(path))
+
+
+def test_the_default_model_ships_with_the_code():
+    assert model_registry.ModelRegistry(warmup=False).path == os.path.join(dataset.BASE_DIR, model_registry.MODEL_PATH)
+
+
+def test_other_relative_paths_are_taken_from_the_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _save(tmp_path / "exported.npz", 1.0)
+    registry = model_registry.ModelRegistry("exported.npz", warmup=False)
+    assert registry.path == str(tmp_path / "exported.npz")
+    assert registry.predict(np.zeros((1, 1)))[0] == 1.0
+
+
+def test_changed_file_is_swapped_in_after_loading(tmp_path, monkeypatch):
+    path = tmp_path / "model.npz"
+    _save(path, 1.0)
+    registry = model_registry.ModelRegistry(str(path), warmup=False, check_interval=0)
+    old = registry.get()
+    assert registry.load_count == 1
+    old_checksum = registry.checksum
+
+    # hold the reload in the middle of loading the new file
+    loading, release = threading.Event(), threading.Event()
+    load = tree_model.load
+
+    def slow_load(source):
+        loading.set()
+        release.wait(5)
+        return load(source)
+
+    monkeypatch.setattr(tree_model, "load", slow_load)
+    _save(path, 2.0)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert registry.get() is old
+    assert loading.wait(5)
+    for _ in range(3):
+        assert registry.get() is old
+        assert registry.load_count == 1
+    release.set()
+    deadline = time.monotonic() + 5
+    while registry.load_count < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert registry.load_count == 2
+    assert registry.get() is not old
+    assert registry.checksum != old_checksum
+    assert registry.predict(np.zeros((1, 1)))[0] == 2.0
+    assert registry.stats()["load_count"] == 2
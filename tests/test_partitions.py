@@ -0,0 +1,104 @@
+"""Ingest into the partitioned dataset and query it back."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset
+import partitions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def hourly():
+    rows = pd.read_csv(os.path.join(ROOT, dataset.HOURLY_CSV))
+    # January to March 2011
+    return rows.loc[(rows["yr"] == 0) & (rows["mnth"] <= 3)].reset_index(drop=True)
+
+
+@pytest.fixture
+def logs(tmp_path, hourly):
+    dc = tmp_path / "dc.csv"
+    hourly.to_csv(dc, index=False)
+    # a second system with its own counts, given in a system column
+    ny = hourly.assign(cnt=hourly["cnt"] * 2, system="ny")
+    ny_path = tmp_path / "ny.csv"
+    ny.to_csv(ny_path, index=False)
+    return str(dc), str(ny_path)
+
+
+@pytest.fixture
+def root(tmp_path, logs):
+    root = str(tmp_path / "partitioned")
+    dc, ny = logs
+    # small chunks, so a month is split into several parts
+    partitions.ingest(dc, root, system="dc", chunksize=500)
+    partitions.ingest(ny, root, chunksize=500)
+    return root
+
+
+def _hours(frame):
+    return pd.to_datetime(frame["dteday"]) + pd.to_timedelta(frame["hr"].astype(np.int64), unit="h")
+
+
+def test_ingest_writes_every_row(tmp_path, logs, hourly):
+    root = str(tmp_path / "partitioned")
+    assert partitions.ingest(logs[0], root, system="dc", chunksize=500) == len(hourly)
+    manifest = partitions.load_manifest(root)
+    assert sorted(manifest["partitions"]) == ["dc/2011/01", "dc/2011/02", "dc/2011/03"]
+    assert sum(p["rows"] for p in manifest["partitions"].values()) == len(hourly)
+    assert all(len(p["parts"]) > 1 for p in manifest["partitions"].values())
+    stored = partitions.Selection(root).read()
+    stored = stored.sort_values(["instant"], ignore_index=True)
+    np.testing.assert_array_equal(stored["cnt"], hourly["cnt"])
+    np.testing.assert_array_equal(_hours(stored), _hours(hourly))
+    np.testing.assert_allclose(stored["temp"], hourly["temp"], rtol=1e-6)
+
+
+def test_ingesting_a_source_again_is_skipped(root, logs):
+    before = partitions.load_manifest(root)
+    assert partitions.ingest(logs[0], root, system="dc") == 0
+    after = partitions.load_manifest(root)
+    assert after["version"] == before["version"]
+    assert after["partitions"] == before["partitions"]
+
+
+def test_a_log_without_a_system_is_rejected(tmp_path, logs):
+    with pytest.raises(ValueError, match="system"):
+        partitions.ingest(logs[0], str(tmp_path / "partitioned"))
+
+
+def test_queries_prune_by_system_and_date(root, monkeypatch):
+    selection = partitions.Selection(root, ["ny"], "2011-02-01", "2011-03-01")
+    assert [(p["system"], p["month"]) for p in selection.partitions()] == [("ny", 2)]
+    opened = []
+    open_columns = dataset._open_columns
+
+    def recording(path):
+        opened.append(os.path.relpath(path, root))
+        return open_columns(path)
+
+    monkeypatch.setattr(dataset, "_open_columns", recording)
+    rows = selection.read(["dteday", "cnt", "system"])
+    assert opened and all(path.startswith("system=ny/year=2011/month=02/") for path in opened)
+    assert (rows["system"] == "ny").all()
+    assert partitions.systems(root) == ["dc", "ny"]
+    assert partitions.date_range(root, ["dc"]) == (pd.Timestamp("2011-01-01"), pd.Timestamp("2011-03-31"))
+
+
+def test_dates_are_filtered_inside_a_partition(root, hourly):
+    rows = partitions.Selection(root, ["dc"], "2011-01-15", "2011-02-10").read(["dteday", "hr", "cnt"])
+    dates = pd.to_datetime(hourly["dteday"])
+    expected = hourly.loc[(dates >= "2011-01-15") & (dates < "2011-02-10")]
+    assert len(rows) == len(expected)
+    assert rows["dteday"].min() == pd.Timestamp("2011-01-15")
+    assert rows["dteday"].max() == pd.Timestamp("2011-02-09")
+    assert rows["cnt"].sum() == expected["cnt"].sum()
+
+
+def test_scan_combines_parts_into_chunks(root):
+    chunks = list(partitions.scan(root, ["dc"], columns=["cnt"], chunksize=1000))
+    assert all(len(chunk) >= 1000 for chunk in chunks[:-1])
+    assert sum(len(chunk) for chunk in chunks) == partitions.Selection(root, ["dc"]).rows()
@@ -0,0 +1,107 @@
+"""Row validation of the prediction service, alone and micro-batched."""
+import asyncio
+
+import pytest
+
+import model_registry
+import serve
+
+ROW = {"year": 1, "month": 6, "day": 15, "hour": 17, "holiday": 0, "weekday": 3,
+       "weather": 1, "temp": 25, "humidity": 50, "windspeed": 10}
+
+BAD_ROWS = [
+    ({k: v for k, v in ROW.items() if k != "windspeed"}, "missing 'windspeed'"),
+    (dict(ROW, windspeed=None), "'windspeed' must be a number"),
+    (dict(ROW, temp="warm"), "'temp' must be a number"),
+    (dict(ROW, windspeed=[1, 2]), "'windspeed' must be a number"),
+    (dict(ROW, humidity={"value": 50}), "'humidity' must be a number"),
+    (dict(ROW, hour=-1), "'hour' must be an integer from 0 to 23"),
+    (dict(ROW, hour=2.5), "'hour' must be an integer from 0 to 23"),
+    (dict(ROW, month=0), "'month' must be an integer from 1 to 12"),
+    (dict(ROW, weather=9), "'weather' must be an integer from 1 to 4"),
+    ({"mnth": 6, "hr": 17}, "missing"),
+]
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return model_registry.get_registry()
+
+
+@pytest.mark.parametrize("row, message", BAD_ROWS)
+def test_bad_row_is_rejected(row, message):
+    with pytest.raises(serve.RequestError, match=message) as error:
+        serve.rows_to_features([ROW, row])
+    assert error.value.status == 400
+    assert str(error.value).startswith("row 1:")
+
+
+@pytest.mark.parametrize("window", [0.05, 0])
+def test_bad_row_fails_alone_when_batched(registry, window):
+    async def run():
+        batcher = serve.MicroBatcher(registry, window=window)
+        rows = [ROW] + [row for row, _ in BAD_ROWS] + [ROW]
+        return await asyncio.gather(*(batcher.predict_one(row) for row in rows), return_exceptions=True)
+
+    results = asyncio.run(run())
+    expected = float(registry.predict(serve.rows_to_features([ROW]))[0])
+    assert results[0] == results[-1] == pytest.approx(expected)
+    for result, (_, message) in zip(results[1:-1], BAD_ROWS):
+        assert isinstance(result, serve.RequestError) and result.status == 400
+        assert message in str(result)
+
+
+def test_mixed_schemas_in_one_batch(registry):
+    raw = {"dteday": "2012-06-13", "yr": 1, "mnth": 6, "hr": 17, "holiday": 0, "weekday": 3,
+           "workingday": 1, "weathersit": 1, "atemp": 25 / 41, "hum": 0.5, "windspeed": 10 / 67}
+    X = serve.rows_to_features([ROW, raw, ROW])
+    assert len(X) == 3
+    assert (X.iloc[0] == X.iloc[2]).all()
+    assert X.notna().all().all()
+
+
+class FailingOnce:
+    """A registry whose first prediction fails."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("model failure")
+        return self.registry.predict(X)
+
+
+def test_batcher_keeps_serving_after_an_error(registry):
+    async def run():
+        batcher = serve.MicroBatcher(FailingOnce(registry), window=0.01)
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(batcher.predict_one(ROW), 5)
+        return await asyncio.wait_for(batcher.predict_one(ROW), 5)
+
+    assert asyncio.run(run()) == pytest.approx(float(registry.predict(serve.rows_to_features([ROW]))[0]))
+
+
+def _exchange(server, request):
+    async def run():
+        listener = await asyncio.start_server(server.serve_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return response
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_invalid_content_length_is_a_bad_request(registry, length):
+    server = serve.InferenceServer(registry, window=0)
+    response = _exchange(server, ("POST /predict HTTP/1.1\r\nContent-Length: %s\r\n\r\n{}" % length).encode())
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert b"invalid Content-Length" in response
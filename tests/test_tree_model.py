@@ -0,0 +1,76 @@
+"""The NumPy evaluator against the pickled CatBoost model."""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset
+import features
+import tree_model
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PICKLE = os.path.join(ROOT, "bikeRentalsModel.pkl")
+
+# scores the exported model in a fresh interpreter where CatBoost cannot be imported
+NO_CATBOOST = r"""
+import sys
+sys.modules["catboost"] = None
+root, npz, out = sys.argv[1:4]
+sys.path.insert(0, root)
+import numpy as np
+import dataset, features, tree_model
+X = features.model_input(dataset.load_preprocessed())
+np.save(out, tree_model.load(npz).predict(X))
+"""
+
+
+def test_export_matches_the_pickle(tmp_path):
+    pytest.importorskip("catboost")
+    npz = str(tmp_path / "model.npz")
+    tree_model.export(PICKLE, npz)
+    out = str(tmp_path / "predictions.npy")
+    subprocess.run([sys.executable, "-c", NO_CATBOOST, ROOT, npz, out], check=True, cwd=str(tmp_path))
+
+    X = features.model_input(dataset.load_preprocessed())
+    expected = pd.read_pickle(PICKLE).predict(X)
+    np.testing.assert_array_equal(np.load(out), expected)
+
+
+def _split(feature, border):
+    return {"split_type": "FloatFeature", "float_feature_index": feature, "border": border}
+
+
+def test_shallower_trees_are_padded():
+    model_json = {
+        "features_info": {"float_features": [{"feature_id": "b", "flat_feature_index": 1},
+                                             {"feature_id": "a", "flat_feature_index": 0}]},
+        "oblivious_trees": [
+            # depth 2: leaf index = (a > 0.5) + 2 * (b > 1.5)
+            {"splits": [_split(0, 0.5), _split(1, 1.5)], "leaf_values": [1.0, 2.0, 3.0, 4.0]},
+            # depth 1: leaf index = (b > 0.5)
+            {"splits": [_split(1, 0.5)], "leaf_values": [10.0, 20.0]},
+        ],
+        "scale_and_bias": [2.0, [0.5]],
+    }
+    ensemble = tree_model.from_catboost_json(model_json)
+    assert ensemble.feature_names == ["a", "b"]
+    assert ensemble.split_feature.shape == (2, 2)
+    assert np.isinf(ensemble.split_border[1, 1])
+    np.testing.assert_array_equal(ensemble.leaf_values[1], [10.0, 20.0, 0.0, 0.0])
+
+    X = pd.DataFrame({"b": [0.0, 1.0, 2.0, 2.0], "a": [0.0, 0.0, 1.0, 0.0]})
+    leaves = np.array([1.0 + 10.0, 1.0 + 20.0, 4.0 + 20.0, 3.0 + 20.0])
+    np.testing.assert_array_equal(ensemble.predict(X), leaves * 2.0 + 0.5)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    ensemble = tree_model.TreeEnsemble(["a"], [[0]], [[0.5]], [[1.0, 2.0]], scale=1.5, bias=0.25)
+    path = str(tmp_path / "tiny.npz")
+    ensemble.save(path)
+    loaded = tree_model.load(path)
+    X = np.array([[0.0], [1.0]])
+    np.testing.assert_array_equal(loaded.predict(X), ensemble.predict(X))
+    assert loaded.feature_names == ["a"]
@@ -0,0 +1,12 @@
+"""The trendline cache stays bounded."""
+import trendlines
+
+
+def test_cache_is_bounded_and_keeps_recent_entries():
+    for index in range(trendlines.CACHE_SIZE + 10):
+        trendlines._cached(("test", index), lambda: index)
+        # the first entry stays in use
+        assert trendlines._cached(("test", 0), lambda: None) == 0
+    assert len(trendlines._cache) == trendlines.CACHE_SIZE
+    assert ("test", 0) in trendlines._cache
+    assert ("test", 1) not in trendlines._cache
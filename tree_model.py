@@ -0,0 +1,141 @@
+"""Pure-NumPy evaluator for the exported rentals model.
+
+The trained CatBoost model is a sum of oblivious trees: every level of a
+tree tests one feature against one border, and the bits of those tests
+index the leaf.  ``export`` flattens the trees into a few arrays (split
+features, split borders, leaf values, scale and bias) saved as ``.npz``;
+``load`` reads them back with NumPy alone, so serving does not need to
+import CatBoost, scikit-learn or PyCaret.
+
+    python tree_model.py export bikeRentalsModel.pkl bikeRentalsModel.npz
+"""
+import argparse
+import json
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+# rows scored per step; bounds the (rows x trees) temporaries
+CHUNK_ROWS = 2048
+
+
+class TreeEnsemble:
+    def __init__(self, feature_names, split_feature, split_border, leaf_values, scale=1.0, bias=0.0):
+        self.feature_names = list(feature_names)
+        self.split_feature = np.asarray(split_feature, dtype=np.intp)
+        self.split_border = np.asarray(split_border, dtype=np.float32)
+        self.leaf_values = np.asarray(leaf_values, dtype=np.float64)
+        if self.split_feature.shape[1] > 8:
+            raise ValueError("trees deeper than 8 levels are not supported")
+        self.scale = float(scale)
+        self.bias = float(bias)
+        trees, depth = self.split_feature.shape
+        self._leaf_offsets = (np.arange(trees) << depth)[:, None]
+        self._flat_leaves = self.leaf_values.ravel()
+
+    @property
+    def tree_count(self):
+        return self.split_feature.shape[0]
+
+    def _matrix(self, X):
+        if hasattr(X, "columns"):
+            X = X[self.feature_names].to_numpy()
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        return X
+
+    def predict(self, X):
+        """Predictions for a 2-D array or a DataFrame holding ``feature_names``."""
+        # features x rows, so that gathering one feature per tree reads contiguous rows
+        columns = np.ascontiguousarray(self._matrix(X).T)
+        out = np.empty(columns.shape[1], dtype=np.float64)
+        depth = self.split_feature.shape[1]
+        leaf = np.empty((self.tree_count, min(CHUNK_ROWS, columns.shape[1])), dtype=np.uint8)
+        for start in range(0, columns.shape[1], CHUNK_ROWS):
+            rows = columns[:, start:start + CHUNK_ROWS]
+            chunk_leaf = leaf[:, :rows.shape[1]]
+            chunk_leaf[:] = 0
+            for level in range(depth):
+                # same comparison as CatBoost: float32 value > float32 border
+                bits = rows[self.split_feature[:, level]] > self.split_border[:, level, None]
+                chunk_leaf |= bits.view(np.uint8) << np.uint8(level)
+            index = chunk_leaf.astype(np.intp)
+            index += self._leaf_offsets
+            out[start:start + CHUNK_ROWS] = self._flat_leaves[index].sum(axis=0)
+        return out * self.scale + self.bias
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez(f, feature_names=np.array(self.feature_names), split_feature=self.split_feature.astype(np.int16),
+                     split_border=self.split_border, leaf_values=self.leaf_values,
+                     scale=np.float64(self.scale), bias=np.float64(self.bias))
+
+
+def load(path_or_file):
+    """A ``TreeEnsemble`` from an exported ``.npz`` (path or file object)."""
+    with np.load(path_or_file) as arrays:
+        return TreeEnsemble(arrays["feature_names"].tolist(), arrays["split_feature"], arrays["split_border"],
+                            arrays["leaf_values"], arrays["scale"], arrays["bias"])
+
+
+def from_catboost_json(model_json):
+    """A ``TreeEnsemble`` from CatBoost's JSON model format (numeric features only)."""
+    float_features = model_json["features_info"]["float_features"]
+    names = [feature["feature_id"] for feature in sorted(float_features, key=lambda f: f["flat_feature_index"])]
+    trees = model_json["oblivious_trees"]
+    depth = max(len(tree["splits"]) for tree in trees)
+    split_feature = np.zeros((len(trees), depth), dtype=np.intp)
+    # padding levels compare against +inf, are always false and keep the leaf index
+    split_border = np.full((len(trees), depth), np.inf, dtype=np.float32)
+    leaf_values = np.zeros((len(trees), 1 << depth), dtype=np.float64)
+    for t, tree in enumerate(trees):
+        for level, split in enumerate(tree["splits"]):
+            if split["split_type"] != "FloatFeature":
+                raise ValueError("unsupported split type %r" % split["split_type"])
+            split_feature[t, level] = split["float_feature_index"]
+            split_border[t, level] = split["border"]
+        values = tree["leaf_values"]
+        leaf_values[t, :len(values)] = values
+    scale, bias = model_json.get("scale_and_bias", [1.0, [0.0]])
+    bias = bias[0] if isinstance(bias, list) else bias
+    return TreeEnsemble(names, split_feature, split_border, leaf_values, scale, bias)
+
+
+def from_catboost(model):
+    """A ``TreeEnsemble`` from a fitted CatBoost model object."""
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        model.save_model(path, format="json")
+        with open(path) as f:
+            return from_catboost_json(json.load(f))
+    finally:
+        os.remove(path)
+
+
+def export(model_path, out_path):
+    """Flatten the pickled model at ``model_path`` into ``out_path`` (needs CatBoost)."""
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    ensemble = from_catboost(model)
+    ensemble.save(out_path)
+    return ensemble
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the pickled model to NumPy arrays.")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("model", nargs="?", default="bikeRentalsModel.pkl")
+    parser.add_argument("output", nargs="?", default="bikeRentalsModel.npz")
+    args = parser.parse_args(argv)
+
+    ensemble = export(args.model, args.output)
+    print("exported %d trees of depth %d to %s (%d bytes)"
+          % (ensemble.tree_count, ensemble.split_feature.shape[1], args.output, os.path.getsize(args.output)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Fast LOWESS trendlines and density scatter plots for the EDA page.
+
+``px.scatter(..., trendline="lowess")`` runs statsmodels over every row
+and sends every point to the browser.  Here the points are first reduced
+to at most ``bins`` weighted bins (one per distinct x value when there are
+few, as for the dataset's temperature and humidity), the locally weighted
+linear fits are solved for all bins at once with array operations, and the
+result is cached by dataset hash.  Above ``DENSITY_THRESHOLD`` points the
+scatter layer is replaced by a 2D histogram binned on the server.
+"""
+import collections
+import threading
+
+import numpy as np
+import plotly.graph_objects as go
+
+import dataset
+
+FRAC = 2 / 3
+BINS = 256
+ROBUST_ITERATIONS = 3
+DENSITY_THRESHOLD = 5000
+DENSITY_BINS = 50
+# trendlines and histograms kept in memory, the most recent last
+CACHE_SIZE = 64
+
+_cache = collections.OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _bin_codes(x, bins):
+    values, codes = np.unique(x, return_inverse=True)
+    if len(values) > bins:
+        edges = np.linspace(x.min(), x.max(), bins + 1)
+        codes = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, bins - 1)
+    # renumber so that only non-empty bins remain
+    used, codes = np.unique(codes, return_inverse=True)
+    return codes, len(used)
+
+
+def _local_linear(at, bin_x, bin_y, weights):
+    # weighted least squares line for every row of ``weights``, evaluated at ``at``
+    sw = weights.sum(axis=1)
+    sx = weights @ bin_x
+    sy = weights @ bin_y
+    sxx = weights @ (bin_x * bin_x)
+    sxy = weights @ (bin_x * bin_y)
+    det = sw * sxx - sx * sx
+    flat = np.abs(det) <= 1e-12 * np.maximum(sw * sxx, 1e-300)
+    slope = np.where(flat, 0.0, (sw * sxy - sx * sy) / np.where(flat, 1.0, det))
+    intercept = (sy - slope * sx) / np.where(sw > 0, sw, 1.0)
+    return intercept + slope * at
+
+
+def lowess(x, y, frac=FRAC, bins=BINS, iterations=ROBUST_ITERATIONS):
+    """LOWESS smoother over binned points; returns (x, smoothed y) at the bin centres.
+
+    Every bin stands for the points in it: neighbourhoods cover ``frac`` of
+    all points and the robustifying bisquare weights are computed per point,
+    as in statsmodels.  When each bin holds a single distinct x value (the
+    case for the dataset's temperature and humidity) the result is the same
+    as ``statsmodels.nonparametric.lowess``.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    codes, n_bins = _bin_codes(x, bins)
+    counts = np.bincount(codes, minlength=n_bins)
+    bin_x = np.bincount(codes, weights=x, minlength=n_bins) / counts
+    if n_bins < 2:
+        return bin_x, np.bincount(codes, weights=y, minlength=n_bins) / counts
+
+    distance = np.abs(bin_x[:, None] - bin_x[None, :])
+    order = np.argsort(distance, axis=1)
+    cumulative = np.cumsum(counts[order], axis=1)
+    needed = np.ceil(frac * len(x))
+    # distance to the farthest bin needed to cover frac of the points
+    reach = np.minimum((cumulative < needed).sum(axis=1), n_bins - 1)
+    radius = np.take_along_axis(distance, order, axis=1)[np.arange(n_bins), reach]
+    kernel = np.clip(1 - (distance / np.maximum(radius, 1e-12)[:, None]) ** 3, 0, None) ** 3
+
+    point_weights = np.ones(len(x))
+    for iteration in range(iterations + 1):
+        weight = np.bincount(codes, weights=point_weights, minlength=n_bins)
+        safe = np.where(weight > 0, weight, 1.0)
+        mean_x = np.where(weight > 0, np.bincount(codes, weights=point_weights * x, minlength=n_bins) / safe, bin_x)
+        mean_y = np.bincount(codes, weights=point_weights * y, minlength=n_bins) / safe
+        fitted = _local_linear(bin_x, mean_x, mean_y, kernel * weight)
+        if iteration == iterations:
+            break
+        residual = y - fitted[codes]
+        scale = 6 * np.median(np.abs(residual))
+        if scale <= 0:
+            break
+        point_weights = np.clip(1 - (residual / scale) ** 2, 0, None) ** 2
+    return bin_x, fitted
+
+
+def _cached(key, compute):
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+            return result
+    result = compute()
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def _columns(source, x, y):
+    if isinstance(source, str):
+        return dataset.load_table(source, columns=[x, y])
+    return source.read([x, y])
+
+
+def _source_key(source):
+    return dataset.source_hash(source) if isinstance(source, str) else source.key
+
+
+def cached_lowess(source, x, y, frac=FRAC, bins=BINS):
+    """``lowess`` of two columns of a dataset CSV or ``partitions.Selection``, cached by its hash / key."""
+    def compute():
+        df = _columns(source, x, y)
+        return lowess(df[x], df[y], frac, bins)
+    return _cached(("lowess", _source_key(source), x, y, frac, bins), compute)
+
+
+def cached_density(source, x, y, bins=DENSITY_BINS):
+    """Bin centres and counts of a 2D histogram of two columns, cached like ``cached_lowess``."""
+    def compute():
+        df = _columns(source, x, y)
+        counts, x_edges, y_edges = np.histogram2d(df[x], df[y], bins=bins)
+        return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts
+    return _cached(("density", _source_key(source), x, y, bins), compute)
+
+
+def scatter_with_trend(source, x, y, title, threshold=DENSITY_THRESHOLD):
+    """Scatter of two columns of a dataset CSV or ``partitions.Selection`` with a red LOWESS trendline.
+
+    Above ``threshold`` rows the points are drawn as a binned heatmap, so
+    the figure size no longer depends on the number of rows.
+    """
+    fig = go.Figure()
+    rows = len(dataset.load_table(source, columns=[x])) if isinstance(source, str) else source.rows()
+    if rows > threshold:
+        x_centres, y_centres, counts = cached_density(source, x, y)
+        # transpose: heatmap rows follow y
+        fig.add_trace(go.Heatmap(x=x_centres, y=y_centres, z=np.where(counts.T > 0, counts.T, np.nan),
+                                 colorscale="Blues", colorbar=dict(title="Hours"), name="Density"))
+    else:
+        df = _columns(source, x, y)
+        fig.add_trace(go.Scatter(x=df[x], y=df[y], mode="markers", name="Hours"))
+    trend_x, trend_y = cached_lowess(source, x, y)
+    fig.add_trace(go.Scatter(x=trend_x, y=trend_y, mode="lines", line=dict(color="red"),
+                             name="LOWESS trendline"))
+    fig.update_layout(title=title, showlegend=False)
+    return fig